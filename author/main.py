@@ -1,13 +1,16 @@
+import hashlib
 import logging
 import os
 import sys
+from contextlib import asynccontextmanager
 from datetime import datetime
 from email import message
 from typing import List, Literal, Optional
 from uuid import UUID, uuid4
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
 from opentelemetry import trace
 from opentelemetry._logs import set_logger_provider
 from opentelemetry.exporter.otlp.proto.grpc._log_exporter import \
@@ -22,8 +25,9 @@ from opentelemetry.sdk.resources import Resource
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor
 from pydantic import BaseModel
-from pymongo import MongoClient
+from pymongo import ASCENDING, MongoClient
 from pymongo.errors import ConnectionFailure, OperationFailure
+from starlette.concurrency import run_in_threadpool
 
 # Logging configuration
 logging.basicConfig(level=logging.INFO)
@@ -75,7 +79,26 @@ PymongoInstrumentor().instrument()
 client = MongoClient(MONGO_CONNECTION_STRING)
 db = client[MONGO_DBNAME]
 
-app = FastAPI()
+def ensure_indexes():
+    # uuid で引く著者の検索を索引で行い，重複した uuid の登録を防ぐ
+    db["author"].create_index(
+        [("uuid", ASCENDING)], name="uuid", unique=True)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        ensure_indexes()
+    except Exception as e:
+        logger.error("Fail to provision indexes: %s", e)
+    try:
+        bump_version()
+    except Exception as e:
+        logger.error("Fail to initialize collection version: %s", e)
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 # FastAPI アプリケーションの計装
 FastAPIInstrumentor.instrument_app(app)
@@ -121,6 +144,91 @@ class AuthorRead(BaseModel):
 
 class AuthorReadSeveral(BaseModel):
     authors: List[AuthorRead]
+    # uuids で指定されたうち見つからなかった著者
+    missing: List[UUID] = []
+
+
+# uuids で1回に指定できる件数の上限
+MAX_UUIDS = int(os.getenv("MAX_UUIDS", 1000))
+
+
+def parse_uuids(uuids: str) -> List[UUID]:
+    """カンマ区切りの UUID を指定された順に重複を除いて返す"""
+    try:
+        parsed = list(dict.fromkeys(
+            UUID(u.strip()) for u in uuids.split(",") if u.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid uuids")
+    if len(parsed) > MAX_UUIDS:
+        raise HTTPException(
+            status_code=400, detail=f"Too many uuids (max {MAX_UUIDS})")
+    return parsed
+
+
+AUTHOR_FIELDS = tuple(AuthorRead.model_fields)
+
+
+def parse_fields(fields: str) -> Optional[dict]:
+    """fields=a,b,c を Mongo の射影にする (uuid は常に含める)"""
+    if not fields:
+        return None
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested - set(AUTHOR_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    requested.add("uuid")
+    projection = {f: 1 for f in AUTHOR_FIELDS if f in requested}
+    projection["_id"] = 0
+    return projection
+
+
+def read_authors_by_uuids(
+        uuids: List[UUID], projection: Optional[dict] = None):
+    found = {
+        entry["uuid"]: entry
+        for entry in db["author"].find(
+            {"uuid": {"$in": uuids}}, projection or {"_id": 0})
+    }
+    missing = [u for u in uuids if u not in found]
+    if projection is not None:
+        # 一部の項目だけの著者は AuthorRead にできないためそのまま返す
+        return {"authors": [found[u] for u in uuids if u in found],
+                "missing": missing}
+    return AuthorReadSeveral(
+        authors=[AuthorRead(**found[u]) for u in uuids if u in found],
+        missing=missing,
+    )
+
+
+def author_version() -> str:
+    entry = db["versions"].find_one({"_id": "author"})
+    return f"{entry['epoch']}.{entry['version']}" if entry else "0"
+
+
+def bump_version():
+    db["versions"].update_one(
+        {"_id": "author"},
+        {"$inc": {"version": 1}, "$setOnInsert": {"epoch": uuid4().hex}},
+        upsert=True)
+
+
+@app.middleware("http")
+async def etag_middleware(request: Request, call_next):
+    """著者の読み出しに版から求めた ETag を付け，一致すれば 304 を返す"""
+    if request.method not in ("GET", "HEAD") or \
+            not request.url.path.startswith("/author"):
+        return await call_next(request)
+    version = await run_in_threadpool(author_version)
+    key = f"{version} {request.url.path}?{request.url.query}"
+    etag = '"' + hashlib.sha1(key.encode()).hexdigest() + '"'
+    if etag in request.headers.get("if-none-match", "").split(", "):
+        return Response(status_code=304, headers={"ETag": etag})
+    response = await call_next(request)
+    if response.status_code == 200:
+        response.headers["ETag"] = etag
+    return response
 
 
 @app.get("/", response_model=ServiceHello)
@@ -155,12 +263,19 @@ def create_author_handler(author: AuthorCreateUpdate):
         "updated_at": datetime.now(),
     }
     insert_id = db["author"].insert_one(my_author).inserted_id
+    bump_version()
     logger.info("insert_id: %s", insert_id)
     return AuthorRead(**my_author)
 
 
 @app.get("/author")
-def read_authors_handler(name: str = ""):
+def read_authors_handler(name: str = "", uuids: str = "", fields: str = ""):
+    # fields が指定されればその項目だけを読み出して返す
+    projection = parse_fields(fields)
+    # uuids が指定されればその著者だけを指定された順に返す
+    if uuids:
+        return read_authors_by_uuids(parse_uuids(uuids), projection)
+
     target_fields = [
         "first_name_ja",
         "middle_name_ja",
@@ -172,7 +287,7 @@ def read_authors_handler(name: str = ""):
     or_conditions = [{tf: {"$regex": name}} for tf in target_fields]
     query = {"$or": or_conditions}
     logger.info("Mongo Query: %s", query)
-    return list(db["author"].find(query, {"_id": 0}))
+    return list(db["author"].find(query, projection or {"_id": 0}))
 
 
 # @app.get("/author", response_model=AuthorReadSeveral)
@@ -212,6 +327,7 @@ def read_author_handler(author_uuid: UUID):
 @app.delete("/reset", response_model=StatusResponse)
 def delete_author_handler():
     res = db["author"].delete_many({})
+    bump_version()
     logger.info("%d documents deleted.", res.deleted_count)
     return StatusResponse(**{"status": "ok"})
 
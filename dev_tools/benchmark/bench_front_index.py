@@ -0,0 +1,116 @@
+"""
+front の著者・論文の結合処理のマイクロベンチマーク
+
+従来の filter() による O(論文数 × 著者数) の結合と，
+front/main.py の索引 (AuthorIndex / PaperIndex) を使った結合を比較する．
+
+使用方法:
+    pip install -r ../../front/requirements.txt
+    python bench_front_index.py --papers 10000 --authors 1000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from uuid import uuid4
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "front"))
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+import main  # noqa: E402
+
+
+def make_dataset(n_papers: int, n_authors: int):
+    authors = [
+        {
+            "uuid": str(uuid4()),
+            "first_name_ja": f"太郎{i}",
+            "last_name_ja": f"山田{i}",
+        }
+        for i in range(n_authors)
+    ]
+    papers = [
+        {
+            "uuid": str(uuid4()),
+            "title": f"論文{i}",
+            "author_uuid": [a["uuid"] for a in random.sample(authors, 3)],
+        }
+        for i in range(n_papers)
+    ]
+    return papers, authors
+
+
+def legacy_join(papers, authors):
+    # 変更前の top_handler の著者名解決
+    result = []
+    for rp in papers:
+        found_author = []
+        for uuid in rp.get("author_uuid"):
+            candidates = filter(lambda x: uuid == x.get("uuid"), authors)
+            candidates_lst = list(candidates)
+            if len(candidates_lst) > 0:
+                author = candidates_lst[0]
+                found_author.append(
+                    author.get("last_name_ja") + " " +
+                    author.get("first_name_ja"))
+        result.append(found_author)
+    return result
+
+
+def indexed_join(papers, authors):
+    authors_idx = main.build_author_index(authors)
+    return [authors_idx.names(rp.get("author_uuid")) for rp in papers]
+
+
+def legacy_by_author(papers, author_uuid):
+    return list(filter(lambda x: author_uuid in x["author_uuid"], papers))
+
+
+def bench(label, func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<40} {best * 1000:10.2f} ms")
+    return best
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--papers", type=int, default=10000)
+    parser.add_argument("--authors", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    random.seed(0)
+    papers, authors = make_dataset(args.papers, args.authors)
+    target = authors[0]["uuid"]
+    print(f"papers={args.papers}, authors={args.authors}")
+
+    assert legacy_join(papers, authors) == indexed_join(papers, authors)
+    assert legacy_by_author(papers, target) == \
+        main.build_paper_index(papers).by_author.get(target, [])
+
+    bench("join: legacy filter()", lambda: legacy_join(papers, authors), 1)
+    bench("join: build index + lookup",
+          lambda: indexed_join(papers, authors), args.repeat)
+    authors_idx = main.build_author_index(authors)
+    bench("join: lookup only (index reused)",
+          lambda: [authors_idx.names(rp["author_uuid"]) for rp in papers],
+          args.repeat)
+
+    bench("by author: legacy filter()",
+          lambda: legacy_by_author(papers, target), args.repeat)
+    bench("by author: build paper index",
+          lambda: main.build_paper_index(papers), args.repeat)
+    papers_idx = main.build_paper_index(papers)
+    bench("by author: lookup only (index reused)",
+          lambda: papers_idx.by_author.get(target, []), args.repeat)
+
+
+if __name__ == "__main__":
+    main_()
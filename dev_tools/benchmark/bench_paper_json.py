@@ -0,0 +1,168 @@
+"""
+paper の論文一覧の JSON 化のマイクロベンチマーク
+
+FastAPI の response_model による従来の経路 (文書ごとの PaperRead の生成，
+PaperReadSeveral としての再検証，json.dumps) と，paper/main.py の
+papers_response() による orjson の経路を比較する．
+計測の前に，両者の出力がバイト単位で一致することを確認する．
+
+使用方法:
+    pip install -r ../../paper/requirements.txt
+    python bench_paper_json.py --papers 1000 --keywords 20
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from uuid import UUID, uuid4
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "paper"))
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+from fastapi.responses import JSONResponse  # noqa: E402
+
+import main  # noqa: E402
+
+
+def make_paper(i: int, n_keywords: int) -> dict:
+    created_at = datetime(2020, 4, 1) + timedelta(
+        days=i, milliseconds=random.randrange(1000))
+    doc = {
+        "_id": i,
+        "uuid": uuid4(),
+        "author_uuid": [str(uuid4()) for _ in range(3)],
+        "title": f"クラウド環境における分散処理の評価 その{i}",
+        "label": f"CDSL-TR-{i:03d}",
+        "is_public": i % 10 != 0,
+        "created_at": created_at,
+        "updated_at": created_at + timedelta(days=1),
+        "keywords": [f"キーワード{k}" for k in range(n_keywords)],
+        "title_normalized": f"クラウド環境における分散処理の評価その{i}",
+        "title_ngrams": ["クラ", "ラウ", "ウド"],
+    }
+    if i % 2:
+        doc["file"] = {"sha256": "0" * 64, "size": 123456 + i,
+                       "pages": None if i % 3 else 12}
+    return doc
+
+
+def edge_papers() -> list:
+    """型や欠けた項目が従来の経路と同じに扱われるかを確かめる文書"""
+    base = make_paper(1, 2)
+    return [
+        # updated_at・keywords・file が無い
+        {k: v for k, v in base.items()
+         if k not in ("updated_at", "keywords", "file")},
+        # updated_at が None，マイクロ秒が 0
+        {**base, "updated_at": None, "created_at": datetime(2021, 1, 1)},
+        # 文字列の uuid (大文字・ハイフン無しは PaperRead 経由になる)
+        {**base, "uuid": str(uuid4()).upper()},
+        {**base, "author_uuid": [uuid4().hex, str(uuid4())]},
+        # 文字列の日時
+        {**base, "created_at": "2021-09-10T08:50:06.721000"},
+        # 想定外の型 (PaperRead で変換される)
+        {**base, "is_public": 1},
+        {**base, "file": {"sha256": "a" * 64, "size": 10, "extra": True}},
+        # 英数字と記号，制御文字を含むタイトル
+        {**base, "title": 'A "quoted" \\ title\t\n ', "label": ""},
+    ]
+
+
+# front のトップページが要求する項目
+TOP_PAGE_FIELDS = ("uuid", "author_uuid", "title", "label", "created_at")
+
+
+def reference_body(docs: list, fields=None, **kwargs) -> bytes:
+    # FastAPI の response_model の処理と同じく，モデルを dict にしてから
+    # PaperReadSeveral として検証し直し，JSON 互換の値にして json.dumps する
+    content = main.PaperReadSeveral(
+        papers=[main.PaperRead(**doc) for doc in docs], **kwargs)
+    validated = main.PaperReadSeveral.model_validate(content.model_dump())
+    include = None
+    if fields is not None:
+        include = {"papers": {"__all__": set(fields)},
+                   "total": True, "next_cursor": True, "missing": True}
+    return JSONResponse(
+        content=validated.model_dump(mode="json", include=include)).body
+
+
+def fast_body(docs: list, fields=None, **kwargs) -> bytes:
+    if fields is not None:
+        # 射影された文書と同じく，要求された項目だけを渡す
+        docs = [{k: v for k, v in doc.items() if k in fields} for doc in docs]
+        kwargs["fields"] = fields
+    return main.papers_response(docs, **kwargs).body
+
+
+def check_parity(docs: list):
+    cases = [
+        ({}, docs),
+        ({"total": len(docs), "next_cursor": "abc"}, docs),
+        ({"missing": [uuid4(), UUID(int=1)]}, docs[:3]),
+        ({}, edge_papers()),
+        ({"fields": TOP_PAGE_FIELDS, "total": 1}, docs),
+        ({"fields": ("uuid", "keywords")}, edge_papers()),
+        ({"total": 0}, []),
+    ]
+    for kwargs, papers in cases:
+        expected = reference_body(papers, **kwargs)
+        actual = fast_body(papers, **kwargs)
+        if expected != actual:
+            for i, (a, b) in enumerate(zip(expected, actual)):
+                if a != b:
+                    break
+            print("parity: MISMATCH", kwargs)
+            print("  reference:", expected[max(0, i - 80):i + 80])
+            print("  fast     :", actual[max(0, i - 80):i + 80])
+            sys.exit(1)
+    print(f"parity: ok ({len(cases)} cases)")
+
+
+def bench(label: str, func, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    print(f"{label:<40}{best * 1000:>10.2f} ms")
+    return best
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--papers", type=int, default=1000)
+    parser.add_argument("--keywords", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    random.seed(0)
+    docs = [make_paper(i, args.keywords) for i in range(args.papers)]
+    check_parity(docs)
+
+    size = len(fast_body(docs))
+    print(f"{args.papers} papers, {args.keywords} keywords each, "
+          f"{size / 1024:.0f} KiB")
+    slow = bench("response_model (PaperRead + json)",
+                 lambda: reference_body(docs), args.repeat)
+    fast = bench("papers_response (orjson)",
+                 lambda: fast_body(docs), args.repeat)
+    print(f"{'speedup':<40}{slow / fast:>10.1f} x")
+    print(f"{'throughput (orjson)':<40}"
+          f"{args.papers / fast:>10.0f} papers/s")
+
+    # fields= で射影した場合 (文書の読み出し量も減る)
+    projected = [{k: v for k, v in doc.items() if k in TOP_PAGE_FIELDS}
+                 for doc in docs]
+    size = len(main.papers_response(projected, fields=TOP_PAGE_FIELDS).body)
+    print(f"fields={','.join(TOP_PAGE_FIELDS)}: {size / 1024:.0f} KiB")
+    bench("papers_response (orjson, projected)",
+          lambda: main.papers_response(projected, fields=TOP_PAGE_FIELDS),
+          args.repeat)
+
+
+if __name__ == "__main__":
+    main_()
@@ -9,6 +9,8 @@ AUTHOR_URL = os.getenv("AUTHOR_ENDPOINT", "http://localhost:4200")
 PAPER_URL = os.getenv("PAPER_ENDPOINT", "http://localhost:4100")
 THUMBNAIL_URL = os.getenv("THUMBNAIL_ENDPOINT", "http://localhost:4400")
 FULLTEXT_URL = os.getenv("FULLTEXT_ENDPOINT", "http://localhost:4500")
+# 論文情報をまとめて登録する件数
+PAPER_BULK_SIZE = 100
 
 
 def _author_add(
@@ -36,16 +38,13 @@ def _author_add(
     assert req.status_code == 200
 
 
-def _paper_add(
+def _paper_payload(
     title: str,
     label: str,
-    pdf_file_path: str,
     author_uuid_list: List,
     created_at: str,
     updated_at: str,
 ):
-    """論文情報の追加"""
-    PAPER_UPLOAD_URL = f"{PAPER_URL}/paper"
     # todo: generate from openapi schema
     suff = ""
     if updated_at == "":
@@ -59,13 +58,27 @@ def _paper_add(
         "created_at": created_at.split("+")[0] + ".000Z",
         "updated_at": updated_at.split("+")[0] + suff,
     }
-    print(json.dumps(payload, indent=4, ensure_ascii=False))
-    req = requests.post(PAPER_UPLOAD_URL, json=payload)
-    print(req)
-    assert req.status_code == 200
-    res = req.json()
-    paper_uuid = res["uuid"]
-
+    return payload
+
+
+def _paper_bulk_add(payloads: List, pdf_file_paths: List):
+    """論文情報をまとめて追加し，続けて論文PDFを追加する"""
+    PAPER_BULK_UPLOAD_URL = f"{PAPER_URL}/paper/bulk"
+    for i in range(0, len(payloads), PAPER_BULK_SIZE):
+        batch = payloads[i:i + PAPER_BULK_SIZE]
+        print(json.dumps(batch, indent=4, ensure_ascii=False))
+        req = requests.post(PAPER_BULK_UPLOAD_URL, json={"papers": batch})
+        print(req)
+        assert req.status_code == 200
+        for result in req.json()["results"]:
+            if result["status"] != "ok":
+                print("Fail to add paper:", batch[result["index"]], result)
+                continue
+            _paper_file_add(
+                result["uuid"], pdf_file_paths[i + result["index"]])
+
+
+def _paper_file_add(paper_uuid: str, pdf_file_path: str):
     """ 論文PDFの追加 """
     try:
         pdffile = {
@@ -148,6 +161,8 @@ def paper_add_wrapper():
 
     with open("papers.json") as f:
         papers = json.load(f)
+    payloads = []
+    pdf_file_paths = []
     for paper in papers:
         authors = paper["author"]
         author_uuids = [
@@ -165,14 +180,16 @@ def paper_add_wrapper():
         # print(authors, author_uuids)
         # print(title, paper_id, _datetime, paper_url_id)
 
-        _paper_add(
+        payloads.append(_paper_payload(
             title=title,
             label=paper_id,
-            pdf_file_path=f"pdf_files/{paper_url_id}.pdf",
             author_uuid_list=author_uuids,
             created_at=created_at,
             updated_at=updated_at,
-        )
+        ))
+        pdf_file_paths.append(f"pdf_files/{paper_url_id}.pdf")
+
+    _paper_bulk_add(payloads, pdf_file_paths)
 
 
 def thumbnail_add():
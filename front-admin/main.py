@@ -2,18 +2,24 @@ import asyncio
 import io
 import logging
 import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import Optional
+from urllib.parse import urlsplit
 from uuid import UUID
 
 import aiohttp
 from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
 from fastapi.responses import RedirectResponse, Response
 from fastapi.templating import Jinja2Templates
-from opentelemetry import trace
+from opentelemetry import metrics, trace
 from opentelemetry._logs import set_logger_provider
 from opentelemetry.exporter.otlp.proto.grpc._log_exporter import \
     OTLPLogExporter
+from opentelemetry.exporter.otlp.proto.grpc.metric_exporter import \
+    OTLPMetricExporter
 from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import \
     OTLPSpanExporter
 from opentelemetry.instrumentation.aiohttp_client import \
@@ -21,6 +27,8 @@ from opentelemetry.instrumentation.aiohttp_client import \
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from opentelemetry.sdk._logs import LoggerProvider, LoggingHandler
 from opentelemetry.sdk._logs.export import BatchLogRecordProcessor
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
 from opentelemetry.sdk.resources import Resource
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor
@@ -37,6 +45,27 @@ SVC_THUMBNAIL_HOST = os.getenv("SERVICE_THUMBNAIL_HOST", "thumbnail-app")
 SVC_THUMBNAIL_PORT = os.getenv("SERVICE_THUMBNAIL_PORT", "8000")
 SVC_FULLTEXT_HOST = os.getenv("SERVICE_FULLTEXT_HOST", "fulltext-app")
 SVC_FULLTEXT_PORT = os.getenv("SERVICE_FULLTEXT_PORT", "8000")
+# fulltext が paper の変更フィードから全文を作る場合は true (EVENTS_GROUP を指定する)
+PAPER_EVENTS_CONSUMERS = os.getenv(
+    "PAPER_EVENTS_CONSUMERS", "false").lower() == "true"
+# 上流ごとのサーキットブレーカー
+# 直近 WINDOW 回のうち失敗率または遅延率が閾値を超えたら OPEN_SEC 秒遮断し，
+# その後 HALF_OPEN_PROBES 回の試行がすべて成功したら復帰する
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", 20))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", 10))
+BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", 0.5))
+BREAKER_SLOW_CALL_SEC = float(os.getenv("BREAKER_SLOW_CALL_SEC", 2))
+BREAKER_SLOW_RATE = float(os.getenv("BREAKER_SLOW_RATE", 0.8))
+BREAKER_OPEN_SEC = float(os.getenv("BREAKER_OPEN_SEC", 10))
+BREAKER_HALF_OPEN_PROBES = int(os.getenv("BREAKER_HALF_OPEN_PROBES", 3))
+# 一覧の描画に使う項目だけを上流から取得する (uuid は常に返される)
+PAPER_LIST_FIELDS = "title,label,created_at"
+AUTHOR_NAME_FIELDS = "first_name_ja,last_name_ja"
+AUTHOR_LIST_FIELDS = (
+    "first_name_ja,middle_name_ja,last_name_ja,"
+    "first_name_en,middle_name_en,last_name_en,"
+    "joined_year,is_graduated,created_at,updated_at"
+)
 
 # =============================================================================
 # OpenTelemetry setup
@@ -52,6 +81,12 @@ tracer_provider = trace.get_tracer_provider()
 otlp_span_exporter = OTLPSpanExporter()
 tracer_provider.add_span_processor(BatchSpanProcessor(otlp_span_exporter))
 
+# Setup MeterProvider with OTLP Metric Exporter
+metric_reader = PeriodicExportingMetricReader(OTLPMetricExporter())
+metrics.set_meter_provider(
+    MeterProvider(resource=resource, metric_readers=[metric_reader]))
+meter = metrics.get_meter(__name__)
+
 # Setup LoggerProvider
 logger_provider = LoggerProvider()
 set_logger_provider(logger_provider)
@@ -83,18 +118,174 @@ FastAPIInstrumentor.instrument_app(app)
 templates = Jinja2Templates(directory="templates")
 
 
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """上流1つ分のサーキットブレーカー
+
+    - closed: 通常どおり呼び出し，結果を直近 BREAKER_WINDOW 回分記録する
+    - open: 呼び出さずに CircuitOpenError とする
+    - half_open: BREAKER_HALF_OPEN_PROBES 回まで試行を通し，
+      すべて成功すれば closed，1回でも失敗すれば open へ戻す
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = self.CLOSED
+        self.transitions = 0
+        self._outcomes: deque = deque(maxlen=BREAKER_WINDOW)
+        self._opened_at = 0.0
+        self._probes_inflight = 0
+        self._probe_successes = 0
+
+    def acquire(self) -> Optional[bool]:
+        """呼び出してよければ試行かどうかを，遮断中なら None を返す"""
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < BREAKER_OPEN_SEC:
+                return None
+            self._transition(self.HALF_OPEN)
+        if self.state == self.HALF_OPEN:
+            if self._probes_inflight >= BREAKER_HALF_OPEN_PROBES:
+                return None
+            self._probes_inflight += 1
+            return True
+        return False
+
+    def record(self, probe: bool, failed: bool, slow: bool):
+        if probe:
+            if self.state != self.HALF_OPEN:
+                return
+            self._probes_inflight -= 1
+            if failed or slow:
+                self._transition(self.OPEN)
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= BREAKER_HALF_OPEN_PROBES:
+                self._transition(self.CLOSED)
+            return
+
+        # 遮断前に始まった呼び出しの結果は判定に使わない
+        if self.state != self.CLOSED:
+            return
+        self._outcomes.append((failed, slow))
+        if len(self._outcomes) < BREAKER_MIN_CALLS:
+            return
+        total = len(self._outcomes)
+        failure_rate = sum(1 for f, _ in self._outcomes if f) / total
+        slow_rate = sum(1 for _, s in self._outcomes if s) / total
+        if failure_rate >= BREAKER_FAILURE_RATE or \
+                slow_rate >= BREAKER_SLOW_RATE:
+            self._transition(self.OPEN)
+
+    def _transition(self, to_state: str):
+        from_state = self.state
+        self.state = to_state
+        self.transitions += 1
+        self._outcomes.clear()
+        self._probes_inflight = 0
+        self._probe_successes = 0
+        if to_state == self.OPEN:
+            self._opened_at = time.monotonic()
+
+        logger.warning("Circuit breaker: upstream=%s, %s -> %s",
+                       self.name, from_state, to_state)
+        attributes = {
+            "upstream": self.name,
+            "from_state": from_state,
+            "to_state": to_state,
+        }
+        breaker_transition_counter.add(1, attributes)
+        trace.get_current_span().add_event(
+            "circuit_breaker.state_change", attributes)
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "transitions": self.transitions,
+            "window_calls": len(self._outcomes),
+            "window_failures": sum(1 for f, _ in self._outcomes if f),
+            "window_slow_calls": sum(1 for _, s in self._outcomes if s),
+        }
+
+
+breaker_transition_counter = meter.create_counter(
+    "circuit_breaker.transitions",
+    description="Number of circuit breaker state changes",
+)
+circuit_breakers: dict = {}
+
+
+def circuit_breaker(name: str) -> CircuitBreaker:
+    if name not in circuit_breakers:
+        circuit_breakers[name] = CircuitBreaker(name)
+    return circuit_breakers[name]
+
+
+def _observe_breaker_states(options):
+    states = {
+        CircuitBreaker.CLOSED: 0,
+        CircuitBreaker.HALF_OPEN: 1,
+        CircuitBreaker.OPEN: 2,
+    }
+    for name, breaker in circuit_breakers.items():
+        yield metrics.Observation(
+            states[breaker.state], {"upstream": name})
+
+
+meter.create_observable_gauge(
+    "circuit_breaker.state",
+    callbacks=[_observe_breaker_states],
+    description="0: closed, 1: half_open, 2: open",
+)
+
+
+@asynccontextmanager
+async def circuit_guard(url: str):
+    """上流の呼び出しを囲み，遮断中なら呼び出さずに例外とする"""
+    breaker = circuit_breaker(urlsplit(url).netloc)
+    probe = breaker.acquire()
+    if probe is None:
+        raise CircuitOpenError(f"Circuit open: {breaker.name}")
+    started = time.monotonic()
+    try:
+        yield
+    except asyncio.CancelledError:
+        # 持ち時間切れで打ち切られた呼び出しは遅延として数える
+        breaker.record(probe, failed=False, slow=True)
+        raise
+    except aiohttp.ClientResponseError as e:
+        slow = time.monotonic() - started >= BREAKER_SLOW_CALL_SEC
+        breaker.record(probe, failed=e.status >= 500, slow=slow)
+        raise
+    except Exception:
+        slow = time.monotonic() - started >= BREAKER_SLOW_CALL_SEC
+        breaker.record(probe, failed=True, slow=slow)
+        raise
+    else:
+        slow = time.monotonic() - started >= BREAKER_SLOW_CALL_SEC
+        breaker.record(probe, failed=False, slow=slow)
+
+
 async def fetch_file(session, url):
-    async with session.get(url) as response:
-        if response.status != 200:
-            response.raise_for_status()
-        return await response.read()
+    async with circuit_guard(url):
+        async with session.get(url) as response:
+            if response.status != 200:
+                response.raise_for_status()
+            return await response.read()
 
 
 async def fetch(session, url):
-    async with session.get(url) as response:
-        if response.status != 200:
-            response.raise_for_status()
-        return await response.json()
+    async with circuit_guard(url):
+        async with session.get(url) as response:
+            if response.status != 200:
+                response.raise_for_status()
+            return await response.json()
 
 
 async def fetch_all(session, urls):
@@ -113,7 +304,10 @@ async def top_handler(request: Request):
 
 @app.get("/paper")
 async def read_paper_list_handler(request: Request):
-    url = f"http://{SVC_PAPER_HOST}:{SVC_PAPER_PORT}/paper"
+    url = (
+        f"http://{SVC_PAPER_HOST}:{SVC_PAPER_PORT}/paper"
+        f"?fields={PAPER_LIST_FIELDS}"
+    )
     async with aiohttp.ClientSession() as session:
         try:
             res_paper = await fetch(session, url)
@@ -138,7 +332,10 @@ async def read_paper_list_handler(request: Request):
 
 @app.get("/paper/add")
 async def add_paper_handler(request: Request):
-    url = f"http://{SVC_AUTHOR_HOST}:{SVC_AUTHOR_PORT}/author"
+    url = (
+        f"http://{SVC_AUTHOR_HOST}:{SVC_AUTHOR_PORT}/author"
+        f"?fields={AUTHOR_NAME_FIELDS}"
+    )
     async with aiohttp.ClientSession() as session:
         try:
             res_author = await fetch(session, url)
@@ -175,8 +372,8 @@ async def add_paper_exec_handler(
         author_list.append(author3)
     req_body = {
         "author_uuid": author_list,
-        "title": title.stip(),
-        "label": label.stip(),
+        "title": title.strip(),
+        "label": label.strip(),
         "is_public": publish,
         "created_at": datetime.now().isoformat(),
         "updated_at": datetime.now().isoformat(),
@@ -188,19 +385,20 @@ async def add_paper_exec_handler(
             """Add paper info"""
             url_meta = f"http://{SVC_PAPER_HOST}:{SVC_PAPER_PORT}/paper"
             logger.info("Request url for paper_meta: %s", url_meta)
-            async with session.post(url_meta, json=req_body) as res_meta:
-                if res_meta.status != 200:
-                    logger.error("Invalid status on meta: %s", res_meta.status)
-                    logger.error("Response on meta: %s", res_meta.json)
-                    raise HTTPException(
-                        status_code=503, detail="Internal Error")
-                res_meta_detail = await res_meta.json()
-                if res_meta_detail.get("uuid"):
-                    paper_uuid = res_meta_detail.get("uuid")
-                else:
-                    raise HTTPException(
-                        status_code=503, detail="Internal Error")
-                logger.info("Response on meta: %s", res_meta_detail)
+            async with circuit_guard(url_meta):
+                async with session.post(url_meta, json=req_body) as res_meta:
+                    if res_meta.status != 200:
+                        logger.error("Invalid status on meta: %s", res_meta.status)
+                        logger.error("Response on meta: %s", res_meta.json)
+                        raise HTTPException(
+                            status_code=503, detail="Internal Error")
+                    res_meta_detail = await res_meta.json()
+                    if res_meta_detail.get("uuid"):
+                        paper_uuid = res_meta_detail.get("uuid")
+                    else:
+                        raise HTTPException(
+                            status_code=503, detail="Internal Error")
+                    logger.info("Response on meta: %s", res_meta_detail)
 
             """ Add paper pdf file """
             url_file = (
@@ -216,19 +414,25 @@ async def add_paper_exec_handler(
                 content_type="application/pdf",
             )
             logger.info("Request url for paper_file: %s", url_file)
-            async with session.post(url_file, data=payload) as res_file:
-                if res_file.status != 200:
-                    logger.error("Invalid status on file: %s", res_file.status)
-                    logger.error("Response on file: %s", res_file.json)
-                    raise HTTPException(
-                        status_code=503, detail="Internal Error")
-                res_file_detail = res_file.json()
-                logger.info("Response on file: %s", res_file_detail)
+            async with circuit_guard(url_file):
+                async with session.post(url_file, data=payload) as res_file:
+                    if res_file.status != 200:
+                        logger.error("Invalid status on file: %s", res_file.status)
+                        logger.error("Response on file: %s", res_file.json)
+                        raise HTTPException(
+                            status_code=503, detail="Internal Error")
+                    res_file_detail = await res_file.json()
+                    logger.info("Response on file: %s", res_file_detail)
 
         except Exception as e:
             logger.error("HTTP Request failed: %s", e)
             raise HTTPException(status_code=503, detail="Internal Error")
 
+    if PAPER_EVENTS_CONSUMERS:
+        # 全文は fulltext が paper の変更フィードから paper.uploaded を
+        # 受け取って非同期に作る
+        return "/paper"
+
     async with aiohttp.ClientSession() as session:
         try:
             """Add fulltext"""
@@ -237,13 +441,14 @@ async def add_paper_exec_handler(
                 f"/fulltext/{paper_uuid}"
             )
             logger.info("Request url for text: %s", url_text)
-            async with session.post(url_text) as res_text:
-                if res_text.status != 200:
-                    logger.error("Invalid status on text: %s", res_text.status)
-                    raise HTTPException(
-                        status_code=503, detail="Internal Error")
-                res_text_detail = res_text.json()
-                logger.info("Response on text: %s", res_text_detail)
+            async with circuit_guard(url_text):
+                async with session.post(url_text) as res_text:
+                    if res_text.status != 200:
+                        logger.error("Invalid status on text: %s", res_text.status)
+                        raise HTTPException(
+                            status_code=503, detail="Internal Error")
+                    res_text_detail = await res_text.json()
+                    logger.info("Response on text: %s", res_text_detail)
 
             # """ Add thumbnail """
             # url_thumb = (f"http://{SVC_THUMBNAIL_HOST}:{SVC_THUMBNAIL_PORT}"
@@ -279,7 +484,10 @@ async def paper_download_handler(paper_uuid: UUID, request: Request):
 
 @app.get("/author")
 async def read_author_list_handler(request: Request):
-    url = f"http://{SVC_AUTHOR_HOST}:{SVC_AUTHOR_PORT}/author"
+    url = (
+        f"http://{SVC_AUTHOR_HOST}:{SVC_AUTHOR_PORT}/author"
+        f"?fields={AUTHOR_LIST_FIELDS}"
+    )
     async with aiohttp.ClientSession() as session:
         try:
             res_author = await fetch(session, url)
@@ -339,13 +547,14 @@ async def add_author_exec_handler(
     logger.info("Request Body: %s", req_body)
     async with aiohttp.ClientSession() as session:
         try:
-            async with session.post(url, json=req_body) as response:
-                if response.status != 200:
-                    logger.error("Invalid status: %s", response.status)
-                    logger.error("Response: %s", response.json)
-                    raise HTTPException(
-                        status_code=503, detail="Internal Error")
-                res = await response.json()
+            async with circuit_guard(url):
+                async with session.post(url, json=req_body) as response:
+                    if response.status != 200:
+                        logger.error("Invalid status: %s", response.status)
+                        logger.error("Response: %s", response.json)
+                        raise HTTPException(
+                            status_code=503, detail="Internal Error")
+                    res = await response.json()
         except Exception as e:
             logger.error("HTTP Request failed: %s", e)
             raise HTTPException(status_code=503, detail="Internal Error")
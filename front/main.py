@@ -1,22 +1,34 @@
 import asyncio
+import gzip
+import hashlib
+import json
 import logging
 import os
 import re
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from email.utils import formatdate
-from typing import Optional, Tuple, Union
+from typing import Awaitable, Callable, Optional, Tuple, Union
+from urllib.parse import quote, urlsplit
 from uuid import UUID, uuid4
 
+import aiofiles
 import aiohttp
 from fastapi import FastAPI, Header, HTTPException, Request
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import FileResponse, HTMLResponse, Response
+from fastapi.responses import (HTMLResponse, RedirectResponse, Response,
+                               StreamingResponse)
 from fastapi.templating import Jinja2Templates
-from opentelemetry import trace
+from opentelemetry import metrics, trace
 from opentelemetry._logs import set_logger_provider
 from opentelemetry.exporter.otlp.proto.grpc._log_exporter import \
     OTLPLogExporter
+from opentelemetry.exporter.otlp.proto.grpc.metric_exporter import \
+    OTLPMetricExporter
 from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import \
     OTLPSpanExporter
 from opentelemetry.instrumentation.aiohttp_client import \
@@ -24,6 +36,8 @@ from opentelemetry.instrumentation.aiohttp_client import \
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from opentelemetry.sdk._logs import LoggerProvider, LoggingHandler
 from opentelemetry.sdk._logs.export import BatchLogRecordProcessor
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
 from opentelemetry.sdk.resources import Resource
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor
@@ -44,7 +58,75 @@ SVC_FULLTEXT_PORT = os.getenv("SERVICE_FULLTEXT_PORT", "8000")
 SVC_STATS_HOST = os.getenv("SERVICE_STATS_HOST", "stats-app")
 SVC_STATS_PORT = os.getenv("SERVICE_STATS_PORT", "8000")
 REQ_TIMEOUT_SEC = int(os.getenv("REQUEST_TIMEOUT_SEC", 5))
+# 上流サービスへのコネクションプール設定
+UPSTREAM_POOL_LIMIT = int(os.getenv("UPSTREAM_POOL_LIMIT", 100))
+UPSTREAM_POOL_LIMIT_PER_HOST = int(
+    os.getenv("UPSTREAM_POOL_LIMIT_PER_HOST", 20))
+UPSTREAM_DNS_CACHE_SEC = int(os.getenv("UPSTREAM_DNS_CACHE_SEC", 60))
+UPSTREAM_KEEPALIVE_SEC = float(os.getenv("UPSTREAM_KEEPALIVE_SEC", 30))
+# ダウンロード数の記録 (stats サービスへのまとめ送信)
+STATS_QUEUE_MAX = int(os.getenv("STATS_QUEUE_MAX", 10000))
+STATS_BATCH_SIZE = int(os.getenv("STATS_BATCH_SIZE", 100))
+STATS_FLUSH_INTERVAL_SEC = float(os.getenv("STATS_FLUSH_INTERVAL_SEC", 1))
+STATS_SPOOL_PATH = os.getenv("STATS_SPOOL_PATH", "/tmp/front-stats-spool.jsonl")
+STATS_SPOOL_MAX_BYTES = int(
+    os.getenv("STATS_SPOOL_MAX_BYTES", 10 * 1024 * 1024))
+# ファイル中継時のチャンクサイズ
+STREAM_CHUNK_BYTES = int(os.getenv("STREAM_CHUNK_BYTES", 64 * 1024))
+# 上流レスポンスのキャッシュ設定
+# TTL を過ぎてから STALE 秒以内はキャッシュを返しつつ裏で更新する
+UPSTREAM_CACHE_TTL_SEC = float(os.getenv("UPSTREAM_CACHE_TTL_SEC", 60))
+UPSTREAM_CACHE_STALE_SEC = float(os.getenv("UPSTREAM_CACHE_STALE_SEC", 600))
+# 検索語や uuids の組み合わせごとに URL が増えるため件数で上限を決める
+UPSTREAM_CACHE_MAX_ENTRIES = int(os.getenv("UPSTREAM_CACHE_MAX_ENTRIES", 1000))
+# 上流の ETag と解析済みの本文を保持する再検証用キャッシュ (本文のサイズで上限を決める)
+REVALIDATION_CACHE_MAX_BYTES = int(
+    os.getenv("REVALIDATION_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+# 描画済みHTMLのキャッシュ (gzip 圧縮後のサイズで上限を決める)
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+PAGE_CACHE_TTL_SEC = float(
+    os.getenv("PAGE_CACHE_TTL_SEC", UPSTREAM_CACHE_TTL_SEC))
+# paper・author の版を確かめる間隔 (変われば描画済みページを作り直す)．
+# ダウンロード数と全文検索の結果は PAGE_CACHE_TTL_SEC で更新する
+UPSTREAM_VERSION_POLL_SEC = float(os.getenv("UPSTREAM_VERSION_POLL_SEC", 1))
+# 1リクエストあたりの上流呼び出しの持ち時間
+# 任意の上流は観測した応答時間の p95 × FACTOR (下限 MIN) で打ち切る
+REQUEST_DEADLINE_SEC = float(
+    os.getenv("REQUEST_DEADLINE_SEC", REQ_TIMEOUT_SEC))
+OPTIONAL_BUDGET_FACTOR = float(os.getenv("OPTIONAL_BUDGET_FACTOR", 2))
+OPTIONAL_BUDGET_MIN_SEC = float(os.getenv("OPTIONAL_BUDGET_MIN_SEC", 0.2))
+LATENCY_WINDOW = int(os.getenv("LATENCY_WINDOW", 200))
+# サムネイル画像のキャッシュ
+THUMBNAIL_CACHE_MAX_BYTES = int(
+    os.getenv("THUMBNAIL_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+THUMBNAIL_MAX_AGE_SEC = int(os.getenv("THUMBNAIL_MAX_AGE_SEC", 7 * 86400))
+# 論文の PDF とサムネイル画像の配信方法
+#   proxy: paper・thumbnail を経由して中継する
+#   presigned: 署名付き URL で MinIO から直接中継する (paper・thumbnail を経由しない)
+#   redirect: 署名付き URL へクライアントを転送する (front も経由しない)．
+#     PDF の ETag は MinIO のもの (MD5) になり，他の方法の ETag とは一致しない
+DOWNLOAD_MODE = os.getenv("DOWNLOAD_MODE", "proxy")
+DOWNLOAD_MODES = ("proxy", "presigned", "redirect")
+if DOWNLOAD_MODE not in DOWNLOAD_MODES:
+    logger.warning("Unknown DOWNLOAD_MODE %s, use proxy", DOWNLOAD_MODE)
+    DOWNLOAD_MODE = "proxy"
+# 署名付き URL を使い回す期間 (有効期間の半分を超えない)
+PRESIGNED_URL_CACHE_SEC = float(os.getenv("PRESIGNED_URL_CACHE_SEC", 60))
+PRESIGNED_URL_CACHE_MAX = int(os.getenv("PRESIGNED_URL_CACHE_MAX", 10000))
+# 上流ごとのサーキットブレーカー
+# 直近 WINDOW 回のうち失敗率または遅延率が閾値を超えたら OPEN_SEC 秒遮断し，
+# その後 HALF_OPEN_PROBES 回の試行がすべて成功したら復帰する
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", 20))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", 10))
+BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", 0.5))
+BREAKER_SLOW_CALL_SEC = float(os.getenv("BREAKER_SLOW_CALL_SEC", 2))
+BREAKER_SLOW_RATE = float(os.getenv("BREAKER_SLOW_RATE", 0.8))
+BREAKER_OPEN_SEC = float(os.getenv("BREAKER_OPEN_SEC", 10))
+BREAKER_HALF_OPEN_PROBES = int(os.getenv("BREAKER_HALF_OPEN_PROBES", 3))
 PAPERS_PER_PAGE = 20
+# 一覧の描画に使う項目だけを上流から取得する (uuid は常に返される)
+PAPER_LIST_FIELDS = "title,author_uuid,label,created_at"
+AUTHOR_NAME_FIELDS = "first_name_ja,last_name_ja"
 
 # =============================================================================
 # OpenTelemetry setup
@@ -60,6 +142,12 @@ tracer_provider = trace.get_tracer_provider()
 otlp_span_exporter = OTLPSpanExporter()
 tracer_provider.add_span_processor(BatchSpanProcessor(otlp_span_exporter))
 
+# Setup MeterProvider with OTLP Metric Exporter
+metric_reader = PeriodicExportingMetricReader(OTLPMetricExporter())
+metrics.set_meter_provider(
+    MeterProvider(resource=resource, metric_readers=[metric_reader]))
+meter = metrics.get_meter(__name__)
+
 # Setup LoggerProvider
 logger_provider = LoggerProvider()
 set_logger_provider(logger_provider)
@@ -84,9 +172,128 @@ logging.getLogger().addHandler(otlp_handler)
 AioHttpClientInstrumentor().instrument()
 
 TIMEOUT = aiohttp.ClientTimeout(total=REQ_TIMEOUT_SEC)
+# ストリーミング中継は全体の時間で打ち切らず，接続と読み込みの停滞のみを制限する
+STREAM_TIMEOUT = aiohttp.ClientTimeout(
+    total=None, sock_connect=REQ_TIMEOUT_SEC, sock_read=REQ_TIMEOUT_SEC)
+
+# =============================================================================
+# Upstream HTTP client
+# =============================================================================
+
+# 全ハンドラで共有する ClientSession (lifespan で生成・破棄する)
+http_session: Optional[aiohttp.ClientSession] = None
+
+# コネクションプールの利用状況 (ホストごと)
+pool_counters: dict = {}
+
+
+def _pool_counter(host: str) -> dict:
+    return pool_counters.setdefault(host, {
+        "requests": 0,
+        "connections_created": 0,
+        "connections_reused": 0,
+        "connections_queued": 0,
+        "dns_cache_hit": 0,
+        "dns_cache_miss": 0,
+    })
+
+
+async def _on_request_start(session, ctx, params):
+    ctx.host = params.url.host
+    _pool_counter(ctx.host)["requests"] += 1
+
+
+async def _on_connection_queued_start(session, ctx, params):
+    _pool_counter(getattr(ctx, "host", ""))["connections_queued"] += 1
+
+
+async def _on_connection_create_end(session, ctx, params):
+    _pool_counter(getattr(ctx, "host", ""))["connections_created"] += 1
+
+
+async def _on_connection_reuseconn(session, ctx, params):
+    _pool_counter(getattr(ctx, "host", ""))["connections_reused"] += 1
+
+
+async def _on_dns_cache_hit(session, ctx, params):
+    _pool_counter(params.host)["dns_cache_hit"] += 1
+
+
+async def _on_dns_cache_miss(session, ctx, params):
+    _pool_counter(params.host)["dns_cache_miss"] += 1
+
+
+def create_http_session() -> aiohttp.ClientSession:
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(_on_request_start)
+    trace_config.on_connection_queued_start.append(
+        _on_connection_queued_start)
+    trace_config.on_connection_create_end.append(_on_connection_create_end)
+    trace_config.on_connection_reuseconn.append(_on_connection_reuseconn)
+    trace_config.on_dns_cache_hit.append(_on_dns_cache_hit)
+    trace_config.on_dns_cache_miss.append(_on_dns_cache_miss)
+    connector = aiohttp.TCPConnector(
+        limit=UPSTREAM_POOL_LIMIT,
+        limit_per_host=UPSTREAM_POOL_LIMIT_PER_HOST,
+        ttl_dns_cache=UPSTREAM_DNS_CACHE_SEC,
+        use_dns_cache=True,
+        keepalive_timeout=UPSTREAM_KEEPALIVE_SEC,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=TIMEOUT,
+        trace_configs=[trace_config],
+    )
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    # lifespan を経由しない起動 (テストクライアント等) でも動くように遅延生成する
+    global http_session
+    if http_session is None or http_session.closed:
+        http_session = create_http_session()
+    return http_session
+
+
+def upstream_pool_stats() -> dict:
+    stats = {
+        "limit": UPSTREAM_POOL_LIMIT,
+        "limit_per_host": UPSTREAM_POOL_LIMIT_PER_HOST,
+        "in_use": 0,
+        "idle": 0,
+        "hosts": pool_counters,
+    }
+    if http_session is None or http_session.closed:
+        return stats
+    # 使用中・待機中の接続数は公開APIが無いため内部属性から取得する
+    connector = http_session.connector
+    stats["in_use"] = len(getattr(connector, "_acquired", ()))
+    stats["idle"] = sum(
+        len(conns) for conns in getattr(connector, "_conns", {}).values())
+    return stats
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    get_http_session()
+    stats_flusher = asyncio.create_task(stats_events.run())
+    version_poller = asyncio.create_task(version_watcher.run())
+    yield
+    tasks = (version_poller, stats_flusher)
+    for task in tasks:
+        task.cancel()
+    for task in tasks:
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    await stats_events.close()
+    if http_session is not None:
+        await http_session.close()
+
 
 _debug = os.getenv("DEBUG", "false").lower() == "true"
 app = FastAPI(
+    lifespan=lifespan,
     docs_url="/docs" if _debug else None,
     redoc_url="/redoc" if _debug else None,
     openapi_url="/openapi.json" if _debug else None,
@@ -102,6 +309,676 @@ templates = Jinja2Templates(directory="templates")
 class FetchUrl:
     url: str = ""
     require: bool = False
+    # 0 より大きい場合はレスポンスを指定秒数キャッシュする
+    cache_ttl: float = 0
+
+
+@dataclass
+class CacheEntry:
+    value: object
+    stored_at: float
+    ttl: float
+
+
+class UpstreamCache:
+    """上流サービスのレスポンスを URL 単位で保持する read-through の LRU キャッシュ
+
+    - TTL 以内: キャッシュを返す (hit)
+    - TTL 超過かつ stale 期間内: キャッシュを返し，裏で1回だけ更新する (stale)
+    - それ以外: 上流を呼ぶ (miss)．同時に来たミスは1回の呼び出しにまとめる
+    - stale 期間を過ぎたエントリは捨て，件数が max_entries を超えたら
+      使われていないものから捨てる
+    """
+
+    def __init__(self, max_entries: int, stale_sec: float):
+        self.max_entries = max_entries
+        self.stale_sec = stale_sec
+        self._entries: OrderedDict = OrderedDict()
+        self._inflight: dict = {}
+        self.counters = {
+            "hit": 0,
+            "stale": 0,
+            "miss": 0,
+            "coalesced": 0,
+            "refresh_error": 0,
+            "expired": 0,
+            "evicted": 0,
+            "invalidated": 0,
+        }
+
+    async def get(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[object]],
+        ttl: float,
+    ):
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry.stored_at
+            if age < ttl:
+                self.counters["hit"] += 1
+                self._entries.move_to_end(key)
+                return entry.value
+            if age < ttl + self.stale_sec:
+                self.counters["stale"] += 1
+                self._entries.move_to_end(key)
+                if key not in self._inflight:
+                    self._start_load(key, loader, ttl)
+                return entry.value
+
+        self.counters["miss"] += 1
+        return await self._load(key, loader, ttl)
+
+    def _start_load(self, key: str, loader, ttl: float) -> asyncio.Task:
+        task = asyncio.create_task(self._run_loader(key, loader, ttl))
+        task.add_done_callback(self._retrieve_error)
+        self._inflight[key] = task
+        return task
+
+    @staticmethod
+    def _retrieve_error(task: asyncio.Task):
+        # 裏での更新は誰も待たないため，失敗 (_run_loader で記録済み) をここで受け取る
+        if not task.cancelled():
+            task.exception()
+
+    async def _load(self, key: str, loader, ttl: float):
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._start_load(key, loader, ttl)
+        else:
+            self.counters["coalesced"] += 1
+        # 呼び出し元がキャンセルされても他の待機者のために読み込みは継続する
+        return await asyncio.shield(task)
+
+    async def _run_loader(self, key: str, loader, ttl: float):
+        try:
+            value = await loader()
+            old = self._entries.pop(key, None)
+            if old is not None and (old.value is value or old.value == value):
+                # 内容が変わらなければ同じオブジェクトを使い続け，
+                # 索引を作り直さずに済ませる
+                value = old.value
+            self._entries[key] = CacheEntry(
+                value=value, stored_at=time.monotonic(), ttl=ttl)
+            self._evict()
+            return value
+        except Exception as e:
+            self.counters["refresh_error"] += 1
+            logger.warning("Cache refresh failed: key=%s, error=%s", key, e)
+            raise e
+        finally:
+            self._inflight.pop(key, None)
+
+    def invalidate(self, prefix: str):
+        """prefix で始まる URL のエントリを捨てる"""
+        keys = [key for key in self._entries if key.startswith(prefix)]
+        for key in keys:
+            del self._entries[key]
+        self.counters["invalidated"] += len(keys)
+
+    def _evict(self):
+        now = time.monotonic()
+        expired = [
+            key for key, entry in self._entries.items()
+            if now - entry.stored_at >= entry.ttl + self.stale_sec]
+        for key in expired:
+            del self._entries[key]
+        self.counters["expired"] += len(expired)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters["evicted"] += 1
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "ttl_sec": UPSTREAM_CACHE_TTL_SEC,
+            "stale_sec": self.stale_sec,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+        }
+
+
+upstream_cache = UpstreamCache(
+    max_entries=UPSTREAM_CACHE_MAX_ENTRIES,
+    stale_sec=UPSTREAM_CACHE_STALE_SEC)
+
+
+class UpstreamVersionWatcher:
+    """paper・author の版の変化を条件付き GET で調べる
+
+    それぞれの版で ETag が決まる URL を If-None-Match 付きで定期的に取得し，
+    ETag が変わればそのサービスの上流キャッシュを捨てて世代番号を進める．
+    描画済みページはこの世代番号が描画時と異なれば使わない．
+    """
+
+    def __init__(self, urls: Tuple[str, ...], interval: float):
+        self.urls = urls
+        self.interval = interval
+        self.generation = 0
+        self._etags: dict = {}
+        self.counters = {"changed": 0, "error": 0}
+
+    async def check(self, url: str):
+        headers = {}
+        # ETag を返さない上流には条件を付けない (変化は検出できない)
+        if self._etags.get(url):
+            headers["If-None-Match"] = self._etags[url]
+        async with circuit_guard(url):
+            async with get_http_session().get(url, headers=headers) as res:
+                if res.status == 304:
+                    return
+                res.raise_for_status()
+                await res.read()
+                etag = res.headers.get("ETag")
+        old = self._etags.get(url)
+        self._etags[url] = etag
+        if old is not None and old != etag:
+            parts = urlsplit(url)
+            upstream_cache.invalidate(f"{parts.scheme}://{parts.netloc}/")
+            self.generation += 1
+            self.counters["changed"] += 1
+
+    async def run(self):
+        while True:
+            for url in self.urls:
+                try:
+                    await self.check(url)
+                except Exception as e:
+                    self.counters["error"] += 1
+                    logger.warning("Version check failed: url=%s, %r", url, e)
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> dict:
+        return {**self.counters, "generation": self.generation}
+
+
+version_watcher = UpstreamVersionWatcher(
+    urls=(
+        f"http://{SVC_PAPER_HOST}:{SVC_PAPER_PORT}/paper?limit=1&fields=uuid",
+        f"http://{SVC_AUTHOR_HOST}:{SVC_AUTHOR_PORT}/author?fields=uuid",
+    ),
+    interval=UPSTREAM_VERSION_POLL_SEC,
+)
+
+
+@dataclass
+class RenderedPage:
+    body: bytes
+    generation: int
+    stored_at: float
+
+
+class RenderedPageCache:
+    """描画済みHTMLを gzip 圧縮して保持する LRU キャッシュ
+
+    上流データの世代番号 (UpstreamVersionWatcher.generation) が描画時と異なるか，
+    TTL を過ぎたエントリは使わない．圧縮後の合計サイズが max_bytes を
+    超えたら古いものから捨てる．
+    """
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._bytes = 0
+        self.counters = {
+            "hit": 0,
+            "miss": 0,
+            "invalidated": 0,
+            "evicted": 0,
+            "stored": 0,
+        }
+
+    def get(self, key: tuple, generation: int) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.counters["miss"] += 1
+            return None
+        expired = time.monotonic() - entry.stored_at >= self.ttl
+        if entry.generation != generation or expired:
+            self.counters["invalidated"] += 1
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        self.counters["hit"] += 1
+        return entry.body
+
+    def put(self, key: tuple, generation: int, html: bytes):
+        body = gzip.compress(html)
+        if len(body) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = RenderedPage(
+            body=body, generation=generation, stored_at=time.monotonic())
+        self._bytes += len(body)
+        self.counters["stored"] += 1
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.counters["evicted"] += 1
+
+    def _remove(self, key: tuple):
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry.body)
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+page_cache = RenderedPageCache(
+    max_bytes=PAGE_CACHE_MAX_BYTES, ttl=PAGE_CACHE_TTL_SEC)
+
+
+@dataclass
+class ValidatedBody:
+    etag: str
+    value: object
+    size: int
+
+
+class RevalidationCache:
+    """上流の ETag と解析済みの本文を URL 単位で保持する LRU キャッシュ
+
+    保持している URL への GET には If-None-Match を付け，上流が 304 を
+    返せば本文の転送と JSON の解析を省いて保持している値をそのまま返す．
+    同じオブジェクトを返すため，そこから作った索引も作り直さずに済む．
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict = OrderedDict()
+        self._bytes = 0
+        self.counters = {"not_modified": 0, "modified": 0, "evicted": 0}
+
+    def get(self, url: str) -> Optional[ValidatedBody]:
+        return self._entries.get(url)
+
+    def not_modified(self, url: str, entry: ValidatedBody) -> object:
+        if url in self._entries:
+            self._entries.move_to_end(url)
+        self.counters["not_modified"] += 1
+        return entry.value
+
+    def put(self, url: str, etag: str, value: object, size: int):
+        self.counters["modified"] += 1
+        if url in self._entries:
+            self._bytes -= self._entries.pop(url).size
+        if size > self.max_bytes:
+            return
+        self._entries[url] = ValidatedBody(etag=etag, value=value, size=size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, oldest = self._entries.popitem(last=False)
+            self._bytes -= oldest.size
+            self.counters["evicted"] += 1
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+revalidation_cache = RevalidationCache(max_bytes=REVALIDATION_CACHE_MAX_BYTES)
+
+
+def cached_html_response(request: Request, body: bytes) -> Response:
+    # gzip を受け付けるクライアントには圧縮済みのまま返す
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        return Response(
+            content=body,
+            media_type="text/html; charset=utf-8",
+            headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"},
+        )
+    return HTMLResponse(content=gzip.decompress(body))
+
+
+@dataclass
+class CachedImage:
+    body: bytes
+    etag: str
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    # If-None-Match は弱い比較で判定する
+    return "*" in candidates or etag in [
+        c[2:] if c.startswith("W/") else c for c in candidates]
+
+
+class ImageCache:
+    """画像のバイト列を合計サイズの上限付きで保持する LRU キャッシュ"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict = OrderedDict()
+        self._bytes = 0
+        self.counters = {"hit": 0, "miss": 0, "evicted": 0}
+
+    def get(self, key: tuple) -> Optional[CachedImage]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.counters["miss"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.counters["hit"] += 1
+        return entry
+
+    def put(self, key: tuple, body: bytes) -> CachedImage:
+        entry = CachedImage(body=body, etag=make_etag(body))
+        if len(body) > self.max_bytes:
+            return entry
+        if key in self._entries:
+            self._bytes -= len(self._entries.pop(key).body)
+        self._entries[key] = entry
+        self._bytes += len(body)
+        while self._bytes > self.max_bytes:
+            _, oldest = self._entries.popitem(last=False)
+            self._bytes -= len(oldest.body)
+            self.counters["evicted"] += 1
+        return entry
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+thumbnail_cache = ImageCache(max_bytes=THUMBNAIL_CACHE_MAX_BYTES)
+
+
+class PresignedUrlCache:
+    """署名付き URL (paper・thumbnail の応答) を期限付きで保持する LRU キャッシュ
+
+    期限が切れた URL は返さない (UpstreamCache のように古い値は使わない)．
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self.counters = {"hit": 0, "miss": 0, "expired": 0}
+
+    def get(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.counters["miss"] += 1
+            return None
+        value, expires = entry
+        if time.monotonic() >= expires:
+            del self._entries[key]
+            self.counters["expired"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.counters["hit"] += 1
+        return value
+
+    def put(self, key: str, value: dict, ttl: float):
+        self._entries.pop(key, None)
+        self._entries[key] = (value, time.monotonic() + ttl)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {**self.counters, "entries": len(self._entries)}
+
+
+presigned_urls = PresignedUrlCache(max_entries=PRESIGNED_URL_CACHE_MAX)
+_not_found_image: Optional[CachedImage] = None
+
+
+def not_found_image() -> CachedImage:
+    # 画像が無い場合の代替画像は初回に読み込んでメモリに置く
+    global _not_found_image
+    if _not_found_image is None:
+        with open("assets/404.png", "rb") as f:
+            body = f.read()
+        _not_found_image = CachedImage(body=body, etag=make_etag(body))
+    return _not_found_image
+
+
+def image_response(
+    image: CachedImage, if_none_match: Optional[str], cache_control: str
+) -> Response:
+    headers = {"ETag": image.etag, "Cache-Control": cache_control}
+    if etag_matches(if_none_match, image.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=image.body, media_type="image/png", headers=headers)
+
+
+# =============================================================================
+# Lookup indexes
+# =============================================================================
+
+def author_display_name(author: dict) -> str:
+    return author.get("last_name_ja") + " " + author.get("first_name_ja")
+
+
+@dataclass
+class AuthorIndex:
+    name_by_uuid: dict
+
+    def names(self, author_uuids: list) -> list:
+        return [self.name_by_uuid[u]
+                for u in author_uuids if u in self.name_by_uuid]
+
+
+@dataclass
+class PaperIndex:
+    by_uuid: dict
+
+
+def build_author_index(res_author: list) -> AuthorIndex:
+    by_uuid = {}
+    for author in res_author:
+        # 重複があれば従来どおり先頭の著者を優先する
+        by_uuid.setdefault(author.get("uuid"), author)
+    return AuthorIndex(
+        name_by_uuid={
+            uuid: author_display_name(author)
+            for uuid, author in by_uuid.items()},
+    )
+
+
+def build_paper_index(res_paper: list) -> PaperIndex:
+    by_uuid = {}
+    for paper in res_paper:
+        by_uuid.setdefault(paper["uuid"], paper)
+    return PaperIndex(by_uuid=by_uuid)
+
+
+class DerivedIndex:
+    """上流レスポンスから作った索引を，レスポンスが更新されるまで使い回す
+
+    UpstreamCache はTTL内なら同一のオブジェクトを返すため，
+    元データの同一性で再構築の要否を判定する．
+    """
+
+    def __init__(self, builder: Callable):
+        self._builder = builder
+        self._source = None
+        self._value = None
+        self.builds = 0
+
+    def get(self, source):
+        if source is not self._source:
+            self._value = self._builder(source)
+            self._source = source
+            self.builds += 1
+        return self._value
+
+
+paper_index = DerivedIndex(build_paper_index)
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """上流1つ分のサーキットブレーカー
+
+    - closed: 通常どおり呼び出し，結果を直近 BREAKER_WINDOW 回分記録する
+    - open: 呼び出さずに CircuitOpenError とする
+    - half_open: BREAKER_HALF_OPEN_PROBES 回まで試行を通し，
+      すべて成功すれば closed，1回でも失敗すれば open へ戻す
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = self.CLOSED
+        self.transitions = 0
+        self._outcomes: deque = deque(maxlen=BREAKER_WINDOW)
+        self._opened_at = 0.0
+        self._probes_inflight = 0
+        self._probe_successes = 0
+
+    def acquire(self) -> Optional[bool]:
+        """呼び出してよければ試行かどうかを，遮断中なら None を返す"""
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < BREAKER_OPEN_SEC:
+                return None
+            self._transition(self.HALF_OPEN)
+        if self.state == self.HALF_OPEN:
+            if self._probes_inflight >= BREAKER_HALF_OPEN_PROBES:
+                return None
+            self._probes_inflight += 1
+            return True
+        return False
+
+    def record(self, probe: bool, failed: bool, slow: bool):
+        if probe:
+            if self.state != self.HALF_OPEN:
+                return
+            self._probes_inflight -= 1
+            if failed or slow:
+                self._transition(self.OPEN)
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= BREAKER_HALF_OPEN_PROBES:
+                self._transition(self.CLOSED)
+            return
+
+        # 遮断前に始まった呼び出しの結果は判定に使わない
+        if self.state != self.CLOSED:
+            return
+        self._outcomes.append((failed, slow))
+        if len(self._outcomes) < BREAKER_MIN_CALLS:
+            return
+        total = len(self._outcomes)
+        failure_rate = sum(1 for f, _ in self._outcomes if f) / total
+        slow_rate = sum(1 for _, s in self._outcomes if s) / total
+        if failure_rate >= BREAKER_FAILURE_RATE or \
+                slow_rate >= BREAKER_SLOW_RATE:
+            self._transition(self.OPEN)
+
+    def _transition(self, to_state: str):
+        from_state = self.state
+        self.state = to_state
+        self.transitions += 1
+        self._outcomes.clear()
+        self._probes_inflight = 0
+        self._probe_successes = 0
+        if to_state == self.OPEN:
+            self._opened_at = time.monotonic()
+
+        logger.warning("Circuit breaker: upstream=%s, %s -> %s",
+                       self.name, from_state, to_state)
+        attributes = {
+            "upstream": self.name,
+            "from_state": from_state,
+            "to_state": to_state,
+        }
+        breaker_transition_counter.add(1, attributes)
+        trace.get_current_span().add_event(
+            "circuit_breaker.state_change", attributes)
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "transitions": self.transitions,
+            "window_calls": len(self._outcomes),
+            "window_failures": sum(1 for f, _ in self._outcomes if f),
+            "window_slow_calls": sum(1 for _, s in self._outcomes if s),
+        }
+
+
+breaker_transition_counter = meter.create_counter(
+    "circuit_breaker.transitions",
+    description="Number of circuit breaker state changes",
+)
+circuit_breakers: dict = {}
+
+
+def circuit_breaker(name: str) -> CircuitBreaker:
+    if name not in circuit_breakers:
+        circuit_breakers[name] = CircuitBreaker(name)
+    return circuit_breakers[name]
+
+
+def _observe_breaker_states(options):
+    states = {
+        CircuitBreaker.CLOSED: 0,
+        CircuitBreaker.HALF_OPEN: 1,
+        CircuitBreaker.OPEN: 2,
+    }
+    for name, breaker in circuit_breakers.items():
+        yield metrics.Observation(
+            states[breaker.state], {"upstream": name})
+
+
+meter.create_observable_gauge(
+    "circuit_breaker.state",
+    callbacks=[_observe_breaker_states],
+    description="0: closed, 1: half_open, 2: open",
+)
+
+
+@asynccontextmanager
+async def circuit_guard(url: str):
+    """上流の呼び出しを囲み，遮断中なら呼び出さずに例外とする"""
+    breaker = circuit_breaker(urlsplit(url).netloc)
+    probe = breaker.acquire()
+    if probe is None:
+        raise CircuitOpenError(f"Circuit open: {breaker.name}")
+    started = time.monotonic()
+    try:
+        yield
+    except asyncio.CancelledError:
+        # 持ち時間切れで打ち切られた呼び出しは遅延として数える
+        breaker.record(probe, failed=False, slow=True)
+        raise
+    except aiohttp.ClientResponseError as e:
+        slow = time.monotonic() - started >= BREAKER_SLOW_CALL_SEC
+        breaker.record(probe, failed=e.status >= 500, slow=slow)
+        raise
+    except Exception:
+        slow = time.monotonic() - started >= BREAKER_SLOW_CALL_SEC
+        breaker.record(probe, failed=True, slow=slow)
+        raise
+    else:
+        slow = time.monotonic() - started >= BREAKER_SLOW_CALL_SEC
+        breaker.record(probe, failed=False, slow=slow)
 
 
 # 日付のフォーマットを修正
@@ -120,15 +997,89 @@ async def http_get_file(
             logger.info("HTTP_GET_FILE: empty")
         else:
             _headers = {"x-request-id": str(x_req_id)}
-        async with session.get(url, headers=_headers) as response:
-            if response.status != 200:
-                response.raise_for_status()
-            return await response.read()
+        count_upstream_calls(made=1)
+        async with circuit_guard(url):
+            async with session.get(url, headers=_headers) as response:
+                if response.status != 200:
+                    response.raise_for_status()
+                return await response.read()
     except Exception as e:
         logger.error(e)
         raise e
 
 
+# ファイル中継で上流へ引き継ぐリクエストヘッダと，クライアントへ返すレスポンスヘッダ
+STREAM_REQUEST_HEADERS = ("range", "if-range", "if-none-match")
+STREAM_RESPONSE_HEADERS = (
+    "content-length",
+    "content-range",
+    "accept-ranges",
+    "etag",
+    "last-modified",
+)
+# そのままクライアントへ返す上流のステータス
+STREAM_PASS_STATUSES = (200, 206, 304, 416)
+
+
+def validators(presigned: dict) -> dict:
+    headers = {"ETag": presigned["etag"]}
+    if presigned.get("last_modified"):
+        headers["Last-Modified"] = presigned["last_modified"]
+    return headers
+
+
+def presigned_conditions(headers: dict, presigned: dict) -> Optional[dict]:
+    """条件付きリクエストを paper の検証子で判定し，MinIO へ送るヘッダを返す
+
+    If-None-Match が一致すれば None (304) を返す．If-Range が一致しなければ
+    Range を外して全体を取得する．
+    """
+    headers = {k.lower(): v for k, v in headers.items()}
+    if etag_matches(headers.pop("if-none-match", None), presigned["etag"]):
+        return None
+    if_range = headers.pop("if-range", None)
+    if if_range is not None and if_range not in (
+            presigned["etag"], presigned.get("last_modified")):
+        headers.pop("range", None)
+    return headers
+
+
+# ファイル取得 (ストリーミング)
+# 本文を読み込まずにレスポンスを返す．呼び出し側で release() すること．
+async def http_open_stream(
+    session: aiohttp.ClientSession,
+    url: str,
+    headers: dict,
+    x_req_id: Optional[UUID],
+) -> aiohttp.ClientResponse:
+    _headers = dict(headers)
+    if x_req_id is None:
+        logger.info("HTTP_OPEN_STREAM: empty")
+    else:
+        _headers["x-request-id"] = str(x_req_id)
+    count_upstream_calls(made=1)
+    # ブレーカーの判定はヘッダ受信までとし，本文の転送時間は含めない
+    async with circuit_guard(url):
+        response = await session.get(
+            url, headers=_headers, timeout=STREAM_TIMEOUT)
+        if response.status not in STREAM_PASS_STATUSES:
+            response.release()
+            raise aiohttp.ClientResponseError(
+                response.request_info,
+                response.history,
+                status=response.status,
+                message=response.reason or "")
+    return response
+
+
+async def iter_stream(response: aiohttp.ClientResponse):
+    try:
+        async for chunk in response.content.iter_chunked(STREAM_CHUNK_BYTES):
+            yield chunk
+    finally:
+        response.release()
+
+
 # マイクロサービス呼び出し: Worker
 async def http_post(
     session: aiohttp.ClientSession,
@@ -143,10 +1094,13 @@ async def http_post(
             logger.info("HTTP_POST: empty")
         else:
             _headers = {"x-request-id": str(x_req_id)}
-        async with session.post(url=url, headers=_headers, json=body) as response:
-            if response.status >= 300:
-                response.raise_for_status()
-            return await response.json()
+        count_upstream_calls(made=1)
+        async with circuit_guard(url):
+            async with session.post(
+                    url=url, headers=_headers, json=body) as response:
+                if response.status >= 300:
+                    response.raise_for_status()
+                return await response.json()
     except Exception as e:
         if require:
             raise e
@@ -167,36 +1121,370 @@ async def http_get(
         else:
             _headers = {"x-request-id": str(x_req_id)}
             logger.info("HTTP_GET: %s", x_req_id)
-        async with session.get(url, headers=_headers) as response:
-            if response.status >= 300:
-                response.raise_for_status()
-            return await response.json()
+        # 前回の本文を保持していれば変更の有無だけを問い合わせる
+        validated = revalidation_cache.get(url)
+        if validated is not None:
+            _headers["If-None-Match"] = validated.etag
+        count_upstream_calls(made=1)
+        started = time.monotonic()
+        async with circuit_guard(url):
+            async with session.get(url, headers=_headers) as response:
+                if response.status == 304 and validated is not None:
+                    res_json = revalidation_cache.not_modified(url, validated)
+                else:
+                    if response.status >= 300:
+                        response.raise_for_status()
+                    body = await response.read()
+                    res_json = json.loads(body)
+                    etag = response.headers.get("ETag")
+                    if etag:
+                        revalidation_cache.put(url, etag, res_json, len(body))
+        upstream_latency.observe(
+            upstream_name(url), time.monotonic() - started)
+        return res_json
     except Exception as e:
         if require:
             raise e
         else:
-            logger.warning("Fetch exception of get: url=%s", url)
+            logger.warning("Fetch exception of get: url=%s, %r", url, e)
+
+
+async def presigned_url(url: str, x_req_id: Optional[UUID]) -> dict:
+    """paper・thumbnail から MinIO の署名付き URL を得る
+
+    redirect ではクライアントが使うため公開用のホストの URL を得る．
+    """
+    url = f"{url}?public={str(DOWNLOAD_MODE == 'redirect').lower()}"
+    cached = presigned_urls.get(url)
+    if cached is not None:
+        return cached
+    res = await http_get(
+        session=get_http_session(), require=True, url=url, x_req_id=x_req_id)
+    presigned_urls.put(
+        url, res, min(PRESIGNED_URL_CACHE_SEC, res["expires_in"] / 2))
+    return res
+
+
+# マイクロサービス呼び出し: キャッシュ経由のWorker
+async def cached_http_get(
+        session: aiohttp.ClientSession,
+        require: bool,
+        url: str,
+        ttl: float,
+        x_req_id: Optional[UUID]):
+    # 失敗をキャッシュしないよう，読み込み自体は常に例外を投げる
+    async def loader():
+        return await http_get(
+            session=session, require=True, url=url, x_req_id=x_req_id)
+
+    try:
+        return await upstream_cache.get(url, loader, ttl)
+    except Exception as e:
+        if require:
+            raise e
+        else:
+            logger.warning("Fetch exception of cached get: url=%s", url)
+
+
+def upstream_name(url: str) -> str:
+    return urlsplit(url).netloc
+
+
+class LatencyTracker:
+    """上流ごとに直近の応答時間を保持し，パーセンタイルを返す"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self._samples: dict = {}
+
+    def observe(self, name: str, elapsed: float):
+        self._samples.setdefault(
+            name, deque(maxlen=self.window)).append(elapsed)
+
+    def percentile(self, name: str, q: float) -> Optional[float]:
+        samples = self._samples.get(name)
+        # 判断材料が少ないうちは値を返さない
+        if not samples or len(samples) < 10:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                "count": len(samples),
+                "p50_ms": _to_ms(self.percentile(name, 0.5)),
+                "p95_ms": _to_ms(self.percentile(name, 0.95)),
+                "optional_budget_ms": _to_ms(
+                    optional_budget(name, REQUEST_DEADLINE_SEC)),
+            }
+            for name, samples in self._samples.items()
+        }
+
+
+def _to_ms(sec: Optional[float]) -> Optional[float]:
+    return None if sec is None else round(sec * 1000, 3)
+
+
+upstream_latency = LatencyTracker(window=LATENCY_WINDOW)
+
+# 応答を縮退させた上流の一覧 (リクエストごと)
+degraded_upstreams: ContextVar[Optional[list]] = ContextVar(
+    "degraded_upstreams", default=None)
+
+
+def mark_degraded(name: str):
+    degraded = degraded_upstreams.get()
+    if degraded is not None and name not in degraded:
+        degraded.append(name)
+
+
+@dataclass
+class UpstreamCallCount:
+    made: int = 0
+    avoided: int = 0
+
+
+# リクエストごとの上流呼び出し回数 (実際に呼んだ数と，計画やキャッシュで省いた数)
+upstream_calls: ContextVar[Optional[UpstreamCallCount]] = ContextVar(
+    "upstream_calls", default=None)
+
+
+def count_upstream_calls(made: int = 0, avoided: int = 0):
+    calls = upstream_calls.get()
+    if calls is not None:
+        calls.made += made
+        calls.avoided += avoided
+
+
+@app.middleware("http")
+async def upstream_report_middleware(request: Request, call_next):
+    degraded: list = []
+    degraded_upstreams.set(degraded)
+    calls = UpstreamCallCount()
+    upstream_calls.set(calls)
+    response = await call_next(request)
+    if degraded:
+        logger.warning("Degraded upstreams: path=%s, upstreams=%s",
+                       request.url.path, degraded)
+        response.headers["X-Degraded-Upstreams"] = ",".join(degraded)
+    if calls.made or calls.avoided:
+        logger.info("Upstream calls: path=%s, made=%d, avoided=%d",
+                    request.url.path, calls.made, calls.avoided)
+    return response
+
+
+def optional_budget(name: str, remaining: float) -> float:
+    p95 = upstream_latency.percentile(name, 0.95)
+    if p95 is None:
+        return remaining
+    return min(remaining, max(OPTIONAL_BUDGET_MIN_SEC,
+                              p95 * OPTIONAL_BUDGET_FACTOR))
+
+
+async def run_with_budget(worker: Awaitable, url: FetchUrl, budget: float):
+    name = upstream_name(url.url)
+    try:
+        result = await asyncio.wait_for(worker, timeout=max(0, budget))
+    except asyncio.TimeoutError:
+        if url.require:
+            raise
+        logger.warning("Upstream budget exceeded: url=%s, budget=%.3f",
+                       url.url, budget)
+        mark_degraded(name)
+        return None
+    # 任意の上流は失敗時に None を返す
+    if result is None and not url.require:
+        mark_degraded(name)
+    return result
 
 
 # マイクロサービス呼び出し: Master
 # Masterから複数のWorkerを呼び出す．
+# 必須の上流はリクエスト全体の持ち時間まで待ち，任意の上流は
+# 観測した応答時間に応じた持ち時間で打ち切って部分的な結果で描画する．
 async def fetch_all(
         session: aiohttp.ClientSession,
         urls: Tuple[FetchUrl],
-        x_req_id: Optional[UUID]):
+        x_req_id: Optional[UUID],
+        deadline: Optional[float] = None):
+    if deadline is None:
+        deadline = time.monotonic() + REQUEST_DEADLINE_SEC
+    remaining = deadline - time.monotonic()
+    calls = upstream_calls.get()
+    made_before = calls.made if calls is not None else 0
     tasks = []
     for url in urls:
-        task = asyncio.create_task(
-            http_get(
+        if url.cache_ttl > 0:
+            worker = cached_http_get(
+                session=session,
+                url=url.url,
+                require=url.require,
+                ttl=url.cache_ttl,
+                x_req_id=x_req_id)
+        else:
+            worker = http_get(
                 session=session,
                 url=url.url,
                 require=url.require,
-                x_req_id=x_req_id))
+                x_req_id=x_req_id)
+        if url.require:
+            budget = remaining
+        else:
+            budget = optional_budget(upstream_name(url.url), remaining)
+        task = asyncio.create_task(run_with_budget(worker, url, budget))
         tasks.append(task)
     results = await asyncio.gather(*tasks)
+    if calls is not None:
+        # キャッシュから返せた分は呼び出しを省けたものとして数える
+        calls.avoided += max(0, len(urls) - (calls.made - made_before))
     return results
 
 
+class StatsEventQueue:
+    """ダウンロードイベントを溜めて stats サービスへまとめて送る
+
+    record() はキューへ積むだけで即座に戻る．バックグラウンドのタスクが
+    STATS_BATCH_SIZE 件または STATS_FLUSH_INTERVAL_SEC 秒ごとに
+    POST /stats/bulk へ送信する．stats が応答しない間は送れなかった
+    イベントをローカルのファイルへ退避し，復旧後と次回の起動時に再送する．
+    """
+
+    def __init__(self, url: str, spool_path: str):
+        self.url = url
+        self.spool_path = spool_path
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=STATS_QUEUE_MAX)
+        # 集めている途中または送信中のバッチ (終了時に取りこぼさないため)
+        self._batch: list = []
+        self.counters = {
+            "enqueued": 0,
+            "flushed": 0,
+            "flush_errors": 0,
+            "spooled": 0,
+            "replayed": 0,
+            "dropped_queue_full": 0,
+            "dropped_spool_full": 0,
+        }
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
+    def record(self, event: dict):
+        try:
+            self._queue.put_nowait(event)
+            self.counters["enqueued"] += 1
+        except asyncio.QueueFull:
+            self.counters["dropped_queue_full"] += 1
+            logger.warning("Stats queue is full, drop event: %s", event)
+
+    async def run(self):
+        # 前回の実行で退避したイベントを起動時に再送する
+        await self._replay_spool()
+        while True:
+            await self._next_batch()
+            flushed = await self._flush(self._batch)
+            self._batch = []
+            if flushed:
+                await self._replay_spool()
+
+    async def close(self):
+        # run() を止めた後に呼ぶ．途中のバッチとキューに残ったイベントを
+        # 1回だけ送信し，失敗したら退避する
+        batch, self._batch = self._batch, []
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        if batch:
+            await self._flush(batch)
+
+    async def _next_batch(self):
+        self._batch.append(await self._queue.get())
+        deadline = time.monotonic() + STATS_FLUSH_INTERVAL_SEC
+        while len(self._batch) < STATS_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                self._batch.append(
+                    await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+    async def _send(self, batch: list):
+        started = time.monotonic()
+        try:
+            await http_post(
+                session=get_http_session(),
+                require=True,
+                url=self.url,
+                body={"events": batch},
+                x_req_id=None,
+            )
+        finally:
+            self.last_flush_ms = (time.monotonic() - started) * 1000
+            self.max_flush_ms = max(self.max_flush_ms, self.last_flush_ms)
+
+    async def _flush(self, batch: list) -> bool:
+        try:
+            await self._send(batch)
+            self.counters["flushed"] += len(batch)
+            return True
+        except Exception as e:
+            self.counters["flush_errors"] += 1
+            logger.warning("Fail to flush stats events: %s", e)
+            await self._spool(batch)
+            return False
+
+    async def _spool(self, batch: list):
+        lines = "".join(
+            json.dumps(event, ensure_ascii=False) + "\n" for event in batch)
+        spool_size = (os.path.getsize(self.spool_path)
+                      if os.path.exists(self.spool_path) else 0)
+        if spool_size + len(lines.encode()) > STATS_SPOOL_MAX_BYTES:
+            self.counters["dropped_spool_full"] += len(batch)
+            logger.error("Stats spool is full, drop %d events", len(batch))
+            return
+        async with aiofiles.open(self.spool_path, "a") as f:
+            await f.write(lines)
+        self.counters["spooled"] += len(batch)
+
+    async def _replay_spool(self):
+        if not os.path.exists(self.spool_path):
+            return
+        async with aiofiles.open(self.spool_path) as f:
+            events = [json.loads(line) async for line in f if line.strip()]
+        for i in range(0, len(events), STATS_BATCH_SIZE):
+            batch = events[i:i + STATS_BATCH_SIZE]
+            try:
+                await self._send(batch)
+                self.counters["replayed"] += len(batch)
+            except Exception as e:
+                # 送れなかった分だけを退避ファイルに残す
+                logger.warning("Fail to replay stats spool: %s", e)
+                async with aiofiles.open(self.spool_path, "w") as f:
+                    await f.write("".join(
+                        json.dumps(event, ensure_ascii=False) + "\n"
+                        for event in events[i:]))
+                return
+        os.remove(self.spool_path)
+
+    def stats(self) -> dict:
+        spool_bytes = (os.path.getsize(self.spool_path)
+                       if os.path.exists(self.spool_path) else 0)
+        return {
+            **self.counters,
+            "queue_depth": self._queue.qsize(),
+            "queue_max": STATS_QUEUE_MAX,
+            "spool_bytes": spool_bytes,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "max_flush_ms": round(self.max_flush_ms, 3),
+        }
+
+
+stats_events = StatsEventQueue(
+    url=f"http://{SVC_STATS_HOST}:{SVC_STATS_PORT}/stats/bulk",
+    spool_path=STATS_SPOOL_PATH,
+)
+
+
 @app.exception_handler(StarletteHTTPException)
 async def custom_http_exception_handler(request, exc):
     logger.error("Error: %s", exc.detail)
@@ -225,7 +1513,151 @@ async def validation_exception_handler(request, exc):
     )
 
 
+@app.get("/statz")
+async def statz_handler():
+    # 負荷試験時のチューニング用に内部の統計情報を返す
+    return {
+        "upstream_pool": upstream_pool_stats(),
+        "upstream_cache": upstream_cache.stats(),
+        "upstream_versions": version_watcher.stats(),
+        "revalidation_cache": revalidation_cache.stats(),
+        "presigned_urls": presigned_urls.stats(),
+        "upstream_latency": upstream_latency.stats(),
+        "stats_events": stats_events.stats(),
+        "page_cache": page_cache.stats(),
+        "thumbnail_cache": thumbnail_cache.stats(),
+        "circuit_breakers": {
+            name: breaker.stats()
+            for name, breaker in circuit_breakers.items()
+        },
+        "index_builds": {
+            "paper": paper_index.builds,
+        },
+    }
+
+
 VALID_SORTS = {"date_desc", "date_asc", "downloads_desc"}
+# paper サービス側で並べ替え・ページングできる並び順
+SERVER_PAGING_SORTS = {"date_desc", "date_asc"}
+
+
+@dataclass
+class TopPagePlan:
+    # paper サービス側でページングするか
+    server_paging: bool
+    # 呼び出す上流 (名前から FetchUrl へ)
+    calls: dict
+    # 不要と判断して省いた上流の名前
+    skipped: Tuple[str, ...]
+
+
+def plan_top_page(keyword: str, sort: str, page: int) -> TopPagePlan:
+    """トップページの表示に必要な上流呼び出しだけを組み立てる"""
+    # キーワード無しの日付順はページ分の論文だけを paper サービスから取得する
+    # (キーワード無しのダウンロード数順は全件が必要)
+    server_paging = not keyword and sort in SERVER_PAGING_SORTS
+    if server_paging:
+        paper_url = paper_page_url(sort, max(1, page))
+    elif keyword:
+        # タイトルに一致する論文だけを paper サービスの索引から取得する
+        paper_url = paper_search_url(keyword)
+    else:
+        paper_url = (
+            f"http://{SVC_PAPER_HOST}:{SVC_PAPER_PORT}/paper"
+            f"?fields={PAPER_LIST_FIELDS}"
+        )
+
+    calls = {
+        # 論文タイトルの検索
+        "paper": FetchUrl(
+            url=paper_url,
+            require=True,
+            cache_ttl=UPSTREAM_CACHE_TTL_SEC),
+    }
+    skipped = []
+    if keyword:
+        q = quote(keyword)
+        # 全文の検索
+        calls["fulltext"] = FetchUrl(
+            url=f"http://{SVC_FULLTEXT_HOST}:{SVC_FULLTEXT_PORT}/fulltext?keyword={q}",
+            require=False,
+        )
+        # 著者名の検索
+        calls["author_search"] = FetchUrl(
+            url=(
+                f"http://{SVC_AUTHOR_HOST}:{SVC_AUTHOR_PORT}/author"
+                f"?name={q}&fields={AUTHOR_NAME_FIELDS}"
+            ),
+            require=False,
+        )
+    else:
+        # キーワードが無ければ検索結果は使わないため呼ばない
+        skipped += ["fulltext", "author_search"]
+    # 統計の取得 (各論文のダウンロード数の表示に使う)
+    calls["stats"] = FetchUrl(
+        url=f"http://{SVC_STATS_HOST}:{SVC_STATS_PORT}/stats",
+        require=False,
+        cache_ttl=UPSTREAM_CACHE_TTL_SEC)
+    return TopPagePlan(
+        server_paging=server_paging, calls=calls, skipped=tuple(skipped))
+
+
+def paper_page_url(sort: str, page: int) -> str:
+    offset = (page - 1) * PAPERS_PER_PAGE
+    return (
+        f"http://{SVC_PAPER_HOST}:{SVC_PAPER_PORT}/paper"
+        f"?sort={sort}&limit={PAPERS_PER_PAGE}&offset={offset}"
+        f"&fields={PAPER_LIST_FIELDS}"
+    )
+
+
+# キーワード検索で paper サービスから取得するタイトル検索結果の上限
+# (全文検索の結果と合わせて並べ替えるため front でページングする．超えた分は
+# 表示せず，その旨をページに示す)
+SEARCH_RESULTS_MAX = 1000
+
+
+def paper_search_url(keyword: str) -> str:
+    # タイトル検索は空白を除いて比較するため，検索語からも除く
+    q = quote(keyword.replace(" ", ""))
+    return (
+        f"http://{SVC_PAPER_HOST}:{SVC_PAPER_PORT}/paper/search"
+        f"?q={q}&limit={SEARCH_RESULTS_MAX}&fields={PAPER_LIST_FIELDS}"
+    )
+
+
+def papers_by_uuids_url(paper_uuids: list) -> str:
+    return (
+        f"http://{SVC_PAPER_HOST}:{SVC_PAPER_PORT}/paper"
+        f"?uuids={','.join(paper_uuids)}&fields={PAPER_LIST_FIELDS}"
+    )
+
+
+def authors_by_uuids_url(author_uuids: list) -> str:
+    return (
+        f"http://{SVC_AUTHOR_HOST}:{SVC_AUTHOR_PORT}/author"
+        f"?uuids={','.join(author_uuids)}&fields={AUTHOR_NAME_FIELDS}"
+    )
+
+
+async def fetch_authors(
+        author_uuids: list,
+        x_req_id: Optional[UUID],
+        deadline: Optional[float] = None) -> AuthorIndex:
+    """指定した著者だけを author サービスから取得する"""
+    # 重複を除き，同じ著者の組み合わせはキャッシュを共有する
+    author_uuids = list(dict.fromkeys(author_uuids))
+    if not author_uuids:
+        return build_author_index([])
+    json_raw = await fetch_all(
+        session=get_http_session(),
+        urls=(FetchUrl(
+            url=authors_by_uuids_url(author_uuids),
+            require=True,
+            cache_ttl=UPSTREAM_CACHE_TTL_SEC),),
+        x_req_id=x_req_id,
+        deadline=deadline)
+    return build_author_index(json_raw[0]["authors"])
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -247,84 +1679,116 @@ async def top_handler(
         if validate_word is None:
             raise HTTPException(status_code=400, detail="不正なキーワードです．")
 
-    urls = (
-        # 論文タイトルの検索
-        FetchUrl(
-            url=f"http://{SVC_PAPER_HOST}:{SVC_PAPER_PORT}/paper",
-            require=True),
-        # 著者の一覧
-        FetchUrl(
-            url=f"http://{SVC_AUTHOR_HOST}:{SVC_AUTHOR_PORT}/author", require=True
-        ),
-        # 全文の検索
-        FetchUrl(
-            url=f"http://{SVC_FULLTEXT_HOST}:{SVC_FULLTEXT_PORT}/fulltext?keyword={striped_keyword}",
-            require=False,
-        ),
-        # 著者名の検索
-        FetchUrl(
-            url=f"http://{SVC_AUTHOR_HOST}:{SVC_AUTHOR_PORT}/author?name={striped_keyword}",
-            require=False,
-        ),
-        # 統計の取得
-        FetchUrl(
-            url=f"http://{SVC_STATS_HOST}:{SVC_STATS_PORT}/stats",
-            require=False),
-    )
-    async with aiohttp.ClientSession(timeout=TIMEOUT) as session:
-        try:
-            json_raw = await fetch_all(
-                session=session, urls=urls, x_req_id=x_request_id
-            )
-        except aiohttp.ClientResponseError as e:
-            logger.error("Top Error 1: %s", e)
-            if e.code == 404:
-                raise HTTPException(status_code=404)
-            raise HTTPException(status_code=503)
-        except Exception as e:
-            logger.error("Top Error 2: %s", e)
-            raise HTTPException(status_code=503)
+    plan = plan_top_page(striped_keyword, sort, page)
+
+    # 描画済みのページがあればそのまま返す
+    page_key = (striped_keyword, page, sort)
+    generation = version_watcher.generation
+    cached_page = page_cache.get(page_key, generation)
+    if cached_page is not None:
+        count_upstream_calls(avoided=len(plan.calls) + len(plan.skipped))
+        return cached_html_response(request, cached_page)
 
-    res_paper = json_raw[0]["papers"]
-    res_author = json_raw[1]
-    res_fulltext = json_raw[2]
-    res_author_search = json_raw[3]
-    res_stats = json_raw[4]
+    count_upstream_calls(avoided=len(plan.skipped))
+    if plan.server_paging:
+        page = max(1, page)
+    urls = tuple(plan.calls.values())
+    try:
+        json_raw = await fetch_all(
+            session=get_http_session(), urls=urls, x_req_id=x_request_id
+        )
+    except aiohttp.ClientResponseError as e:
+        logger.error("Top Error 1: %s", e)
+        if e.code == 404:
+            raise HTTPException(status_code=404)
+        raise HTTPException(status_code=503)
+    except Exception as e:
+        logger.error("Top Error 2: %s", e)
+        raise HTTPException(status_code=503)
+
+    results = dict(zip(plan.calls, json_raw))
+    res_paper = results["paper"]["papers"]
+    res_fulltext = results.get("fulltext")
+    res_author_search = results.get("author_search")
+    res_stats = results.get("stats")
+
+    server_paging = plan.server_paging
+    if server_paging:
+        total_papers = results["paper"].get("total") or 0
+        total_pages = max(
+            1, (total_papers + PAPERS_PER_PAGE - 1) // PAPERS_PER_PAGE)
+        if page > total_pages:
+            # 範囲外のページは最終ページを表示する
+            page = total_pages
+            try:
+                res_paper_page = await cached_http_get(
+                    session=get_http_session(),
+                    require=True,
+                    url=paper_page_url(sort, page),
+                    ttl=UPSTREAM_CACHE_TTL_SEC,
+                    x_req_id=x_request_id,
+                )
+            except Exception as e:
+                logger.error("Top Error 3: %s", e)
+                raise HTTPException(status_code=503)
+            res_paper = res_paper_page["papers"]
+
+    papers_idx = paper_index.get(res_paper)
 
     # 論文タイトルの検索
-    found_papers = []
-    for rp in res_paper:
-        if striped_keyword in rp["title"]:
-            found_papers.append(rp)
+    # (キーワードがあれば paper サービスで絞り込み済み)
+    found_papers = list(res_paper)
+    found_uuids = {rp["uuid"] for rp in res_paper}
+    # タイトルに一致した論文が上限を超えて一部しか取得していないか
+    title_total = results["paper"].get("total") or len(res_paper)
+    search_capped = bool(keyword) and title_total > len(res_paper)
     # print(found_papers)
 
     # 著者名の検索
     author_details = []
-    if keyword:
+    # 著者検索は任意の上流のため，遮断や打ち切りで None になりうる
+    if keyword and res_author_search:
         for author in res_author_search:
-            display_name = (
-                author.get("last_name_ja") + " " + author.get("first_name_ja")
-            )
             author_details.append(
-                {"name": display_name, "uuid": author["uuid"]})
+                {"name": author_display_name(author), "uuid": author["uuid"]})
 
     # 全文の検索
-    paper_id_detail = {rp["uuid"]: rp for rp in res_paper}
     matched_parts = {}
+    fulltext_complete = True
     if res_fulltext:
+        # タイトル検索に含まれない論文だけを uuid で取得する
+        fulltext_papers = papers_idx.by_uuid
+        extra_uuids = [
+            u for u in dict.fromkeys(
+                rf["paper_uuid"] for rf in res_fulltext["fulltexts"])
+            if u not in found_uuids]
+        if extra_uuids:
+            res_extra = (await fetch_all(
+                session=get_http_session(),
+                urls=(FetchUrl(
+                    url=papers_by_uuids_url(extra_uuids),
+                    require=False,
+                    cache_ttl=UPSTREAM_CACHE_TTL_SEC),),
+                x_req_id=x_request_id))[0]
+            if res_extra is None:
+                fulltext_complete = False
+            else:
+                fulltext_papers = {
+                    **fulltext_papers,
+                    **{p["uuid"]: p for p in res_extra["papers"]}}
         for rf in res_fulltext["fulltexts"]:
-            matched_papers = []
-            paper = paper_id_detail.get(rf["paper_uuid"])
+            paper = fulltext_papers.get(rf["paper_uuid"])
             if paper is None:
                 continue
 
             key = paper["uuid"]
-            matched_parts[key] = matched_parts.get(key, []) + [rf["highlight"]]
+            matched_parts.setdefault(key, []).append(rf["highlight"])
 
-            if paper in found_papers:
+            if key in found_uuids:
                 # 検索結果にすでに含まれている場合はスキップ
                 continue
             found_papers.append(paper)
+            found_uuids.add(key)
 
     # print(json.dumps(found_papers, indent=4, ensure_ascii=False))
 
@@ -337,19 +1801,6 @@ async def top_handler(
     # 論文ごとの詳細情報をフラットリストとして構築
     all_papers = []
     for rp in found_papers:
-        # 論文に対応する著者名を検索
-        found_author = []
-        for uuid in rp.get("author_uuid"):
-            candidates = filter(lambda x: uuid == x.get("uuid"), res_author)
-            candidates_lst = list(candidates)
-            if len(candidates_lst) > 0:
-                author = candidates_lst[0]
-                display_name = (
-                    author.get("last_name_ja") +
-                    " " +
-                    author.get("first_name_ja"))
-                found_author.append(display_name)
-
         # 論文の作成年月日
         created_at = datetime.fromisoformat(rp.get("created_at"))
         year_month = created_at.strftime("%Y年%m月")
@@ -364,7 +1815,7 @@ async def top_handler(
         all_papers.append({
             "uuid": paper_uuid,
             "title": rp.get("title", "No Title"),
-            "author": found_author,
+            "author_uuid": rp.get("author_uuid", []),
             "label": rp.get("label", "No Label"),
             "created_at": reformat_datetime(rp.get("created_at")),
             "created_at_dt": created_at,
@@ -373,21 +1824,43 @@ async def top_handler(
             "year_month": year_month,
         })
 
-    # 並べ替え
-    if sort == "date_asc":
-        all_papers.sort(key=lambda x: x["created_at_dt"])
-    elif sort == "downloads_desc":
-        all_papers.sort(key=lambda x: x["downloads"], reverse=True)
-    else:  # date_desc
-        all_papers.sort(key=lambda x: x["created_at_dt"], reverse=True)
-
-    # ページネーション
-    total_papers = len(all_papers)
-    total_pages = max(1, (total_papers + PAPERS_PER_PAGE - 1) // PAPERS_PER_PAGE)
-    page = max(1, min(page, total_pages))
-    start = (page - 1) * PAPERS_PER_PAGE
-    end = start + PAPERS_PER_PAGE
-    paged_papers = all_papers[start:end]
+    if server_paging:
+        # 並べ替え・ページングは paper サービスで済んでいる
+        paged_papers = all_papers
+    else:
+        # 並べ替え
+        if sort == "date_asc":
+            all_papers.sort(key=lambda x: x["created_at_dt"])
+        elif sort == "downloads_desc":
+            all_papers.sort(key=lambda x: x["downloads"], reverse=True)
+        else:  # date_desc
+            all_papers.sort(key=lambda x: x["created_at_dt"], reverse=True)
+
+        # ページネーション
+        total_papers = len(all_papers)
+        total_pages = max(
+            1, (total_papers + PAPERS_PER_PAGE - 1) // PAPERS_PER_PAGE)
+        page = max(1, min(page, total_pages))
+        start = (page - 1) * PAPERS_PER_PAGE
+        end = start + PAPERS_PER_PAGE
+        paged_papers = all_papers[start:end]
+
+    # 著者名はページ分の論文に含まれる著者だけを取得する
+    try:
+        authors_idx = await fetch_authors(
+            [u for p in paged_papers for u in p["author_uuid"]],
+            x_request_id)
+    except aiohttp.ClientResponseError as e:
+        logger.error("Top Error 4: %s", e)
+        if e.code == 404:
+            raise HTTPException(status_code=404)
+        raise HTTPException(status_code=503)
+    except Exception as e:
+        logger.error("Top Error 5: %s", e)
+        raise HTTPException(status_code=503)
+    for p in paged_papers:
+        # 論文に対応する著者名を検索
+        p["author"] = authors_idx.names(p["author_uuid"])
 
     # ページ分の論文を表示用にグループ化
     paged_paper_details: dict = {}
@@ -397,7 +1870,7 @@ async def top_handler(
         for p in paged_papers:
             paged_paper_details.setdefault(p["year_month"], []).append(p)
 
-    return templates.TemplateResponse(
+    response = templates.TemplateResponse(
         request,
         "top.html",
         {
@@ -407,9 +1880,15 @@ async def top_handler(
             "page": page,
             "total_pages": total_pages,
             "total_papers": total_papers,
+            "title_total": title_total,
+            "search_capped": search_capped,
             "sort": sort,
         },
     )
+    # 一部の上流が応答しなかったページは保持しない
+    if all(res is not None for res in json_raw) and fulltext_complete:
+        page_cache.put(page_key, generation, response.body)
+    return response
 
 
 def make_bibtex(paper_details, institution):
@@ -440,108 +1919,55 @@ async def paper_handler(
     x_request_id: Union[UUID, None] = Header(default=None),
 ):
     x_request_id = uuid4() if x_request_id is None else x_request_id
+    deadline = time.monotonic() + REQUEST_DEADLINE_SEC
+    # 著者名・概要・サムネイルは paper がまとめた詳細から得る．
+    # ダウンロード数は頻繁に変わるため stats から並行して得る
     urls = (
         FetchUrl(
-            url=f"http://{SVC_AUTHOR_HOST}:{SVC_AUTHOR_PORT}/author", require=True
-        ),
-        FetchUrl(
-            url=f"http://{SVC_PAPER_HOST}:{SVC_PAPER_PORT}/paper/{paper_uuid}",
+            url=f"http://{SVC_PAPER_HOST}:{SVC_PAPER_PORT}/paper/{paper_uuid}/detail",
             require=True,
         ),
-        FetchUrl(
-            url=f"http://{SVC_THUMBNAIL_HOST}:{SVC_THUMBNAIL_PORT}/thumbnail/{paper_uuid}",
-            require=False,
-        ),
-        FetchUrl(
-            url=f"http://{SVC_FULLTEXT_HOST}:{SVC_FULLTEXT_PORT}/fulltext/{paper_uuid}",
-            require=False,
-        ),
         FetchUrl(
             url=f"http://{SVC_STATS_HOST}:{SVC_STATS_PORT}/stats/{paper_uuid}",
             require=False,
         ),
     )
-    async with aiohttp.ClientSession(timeout=TIMEOUT) as session:
-        try:
-            json_raw = await fetch_all(
-                session=session, urls=urls, x_req_id=x_request_id
-            )
-        except aiohttp.ClientResponseError as e:
-            logger.error("Paper Single View Fetch Error 1: %s", e)
-            if e.code == 404:
-                raise HTTPException(status_code=404)
-            raise HTTPException(status_code=503)
-        except Exception as e:
-            logger.error("Paper Single View Fetch Error 2: %s", e)
-            raise HTTPException(status_code=503)
-
-    res_author = json_raw[0]
-    res_paper_me = json_raw[1]
-    res_thumbnail = json_raw[2]
-    res_fulltext = json_raw[3]
-    res_stats = json_raw[4]
-
-    # 著者の取得
-    found_author = []
-    for uuid in res_paper_me["author_uuid"]:
-        try:
-            candidates = filter(lambda x: uuid == x.get("uuid"), res_author)
-            candidates_lst = list(candidates)
-            if len(candidates_lst) > 0:
-                author = candidates_lst[0]
-                found_author.append(author)
-        except Exception as e:
-            logger.error("Paper Single View Author Error: %s", e)
-            continue
+    try:
+        json_raw = await fetch_all(
+            session=get_http_session(), urls=urls, x_req_id=x_request_id,
+            deadline=deadline
+        )
+        res_detail = json_raw[0]
+        res_stats = json_raw[1]
+    except aiohttp.ClientResponseError as e:
+        logger.error("Paper Single View Fetch Error 1: %s", e)
+        if e.code == 404:
+            raise HTTPException(status_code=404)
+        raise HTTPException(status_code=503)
+    except Exception as e:
+        logger.error("Paper Single View Fetch Error 2: %s", e)
+        raise HTTPException(status_code=503)
 
     # サムネイル一覧
     prefix = f"/thumbnail/{paper_uuid}/"
-    try:
-        thumbnail_list = map(lambda x: prefix + x, res_thumbnail["images"])
-    except Exception:
-        thumbnail_list = []
-
-    # ダウンロード数
-    total_downloads = 0
-    if res_stats:
-        total_downloads = res_stats.get("total_downloads", 0)
+    thumbnail_list = [prefix + x for x in res_detail.get("thumbnails", [])]
 
     paper_details = {
-        "uuid": res_paper_me.get("uuid"),
-        "title": res_paper_me.get("title"),
-        "author": [
-            {
-                "name": author.get("last_name_ja") + " " + author.get("first_name_ja"),
-                "uuid": author.get("uuid"),
-            }
-            for author in found_author
-        ],
-        "label": res_paper_me.get("label"),
-        "created_at": reformat_datetime(res_paper_me.get("created_at")),
-        "updated_at": reformat_datetime(res_paper_me.get("updated_at")),
-        "downloads": total_downloads,
-        "created_year": res_paper_me.get("created_at").split("-")[0],
+        "uuid": res_detail.get("uuid"),
+        "title": res_detail.get("title"),
+        "author": res_detail.get("authors", []),
+        "label": res_detail.get("label"),
+        "created_at": reformat_datetime(res_detail.get("created_at")),
+        "updated_at": reformat_datetime(res_detail.get("updated_at")),
+        "downloads": (res_stats or {}).get("total_downloads", 0),
+        "created_year": res_detail.get("created_at").split("-")[0],
     }
 
     bibtex_data = {}
     bibtex_data["text"] = make_bibtex(
         paper_details, institution="クラウド・分散システム研究室"
     )
-
-    # 全文
-    try:
-        first_page = list(
-            filter(lambda x: x["page_number"] == 0, res_fulltext["fulltexts"])
-        )[0]
-        first_page_text = first_page["text"]
-        # 「概要：」が3文字分あるため+3
-        abstract_starts = first_page_text.find("概要：") + 3
-        abstract_ends = first_page_text.find("1.はじめに")
-        if abstract_ends == -1:
-            abstract_ends = 400
-        first_page_300 = first_page_text[abstract_starts:abstract_ends]
-    except Exception:
-        first_page_300 = ""
+    first_page_300 = res_detail.get("abstract", "")
 
     return templates.TemplateResponse(
         request,
@@ -556,6 +1982,17 @@ async def paper_handler(
     )
 
 
+def counts_as_download(res_paper_file) -> bool:
+    # リダイレクトでは転送結果が分からないため発行した時点で数える
+    if res_paper_file is None:
+        return True
+    if res_paper_file.status == 200:
+        return True
+    content_range = res_paper_file.headers.get("Content-Range", "")
+    return (res_paper_file.status == 206
+            and content_range.replace(" ", "").startswith("bytes0-"))
+
+
 @app.get("/paper/{paper_uuid}/download", response_class=Response)
 async def paper_download_handler(
     paper_uuid: UUID,
@@ -563,61 +2000,82 @@ async def paper_download_handler(
     x_request_id: Union[UUID, None] = Header(default=None),
 ):
     x_request_id = uuid4() if x_request_id is None else x_request_id
-    async with aiohttp.ClientSession(timeout=TIMEOUT) as session:
-        # タスク一覧
-        tasks = []
 
-        # ダウンロード数の更新
-        url = f"http://{SVC_STATS_HOST}:{SVC_STATS_PORT}/stats"
-        body = {
+    # ファイルのダウンロード (本文は読まずにヘッダまで)
+    url = f"http://{SVC_PAPER_HOST}:{SVC_PAPER_PORT}/paper/{paper_uuid}/download"
+    forward_headers = {
+        k: v for k, v in request.headers.items()
+        if k.lower() in STREAM_REQUEST_HEADERS}
+    res_paper_file = None
+    presigned = None
+    try:
+        if DOWNLOAD_MODE in ("presigned", "redirect"):
+            presigned = await presigned_url(f"{url}/url", x_request_id)
+            url = presigned["url"]
+        if DOWNLOAD_MODE == "presigned":
+            # MinIO の ETag は paper のものと異なるため条件は front で判定する
+            forward_headers = presigned_conditions(forward_headers, presigned)
+            if forward_headers is None:
+                return Response(status_code=304, headers=validators(presigned))
+        if DOWNLOAD_MODE != "redirect":
+            res_paper_file = await http_open_stream(
+                session=get_http_session(),
+                url=url,
+                headers=forward_headers,
+                x_req_id=x_request_id)
+    except aiohttp.ClientResponseError as e:
+        logger.error("Paper Download Error 1: %s", e)
+        if e.code == 404:
+            raise HTTPException(status_code=404)
+        raise HTTPException(status_code=503)
+    except Exception as e:
+        logger.error("Paper Download Error 2: %s", e)
+        raise HTTPException(status_code=503)
+
+    # ダウンロード数の更新 (キューへ積むだけで応答を待たない)
+    # 本文を返す応答だけを数え，304・416 や途中からの分割取得
+    # (ビューアの追加読み込みや再開) は数えない
+    if counts_as_download(res_paper_file):
+        event = {
             "paper_uuid": str(paper_uuid),
             "ip_v4_addr": "192.0.2.0",
             "timestamp": datetime.now(timezone.utc).isoformat(),
         }
-        logger.info("Stats update: %s", body)
-        task = asyncio.create_task(
-            http_post(
-                session=session,
-                url=url,
-                body=body,
-                require=False,
-                x_req_id=x_request_id,
-            )
-        )
-        tasks.append(task)
-
-        # ファイルのダウンロード
-        url = f"http://{SVC_PAPER_HOST}:{SVC_PAPER_PORT}/paper/{paper_uuid}/download"
-        task = asyncio.create_task(
-            http_get_file(session=session, url=url, x_req_id=x_request_id)
-        )
-        tasks.append(task)
-
-        # 実行結果の集約
-        try:
-            json_raw = await asyncio.gather(*tasks)
-        except aiohttp.ClientResponseError as e:
-            logger.error("Paper Download Error 1: %s", e)
-            if e.code == 404:
-                raise HTTPException(status_code=404)
-            raise HTTPException(status_code=503)
-        except Exception as e:
-            logger.error("Paper Download Error 2: %s", e)
-            raise HTTPException(status_code=503)
+        logger.info("Stats update: %s", event)
+        stats_events.record(event)
 
-    res_stats = json_raw[0]
-    res_paper_file = json_raw[1]
-    logger.info("Stats Response: %s", res_stats)
+    if res_paper_file is None:
+        # URL には期限があるため転送自体は保持させない
+        return RedirectResponse(
+            url, status_code=302, headers={"Cache-Control": "no-store"})
 
     tomorrow = datetime.utcnow() + timedelta(days=1)
     http_tomorrow = formatdate(tomorrow.timestamp(), usegmt=True)
 
-    return Response(
-        content=res_paper_file,
+    headers = {
+        k: v for k, v in res_paper_file.headers.items()
+        if k.lower() in STREAM_RESPONSE_HEADERS}
+    if presigned is not None:
+        headers = {k: v for k, v in headers.items()
+                   if k.lower() not in ("etag", "last-modified")}
+        headers.update(validators(presigned))
+    headers["Cache-Control"] = "public, max-age=86400"
+    headers["Expires"] = http_tomorrow
+
+    # 本文をチャンク単位で中継し，メモリ使用量をチャンクサイズに抑える
+    return StreamingResponse(
+        iter_stream(res_paper_file),
+        status_code=res_paper_file.status,
         media_type="application/pdf",
-        headers={
-            "Cache-Control": "public, max-age=86400",
-            "Expires": http_tomorrow},
+        headers=headers,
+    )
+
+
+def author_papers_url(author_uuid: UUID, page: int) -> str:
+    offset = (page - 1) * PAPERS_PER_PAGE
+    return (
+        f"http://{SVC_PAPER_HOST}:{SVC_PAPER_PORT}/paper/author/{author_uuid}"
+        f"?limit={PAPERS_PER_PAGE}&offset={offset}&fields={PAPER_LIST_FIELDS}"
     )
 
 
@@ -629,54 +2087,62 @@ async def author_handler(
     x_request_id: Union[UUID, None] = Header(default=None),
 ):
     x_request_id = uuid4() if x_request_id is None else x_request_id
+    deadline = time.monotonic() + REQUEST_DEADLINE_SEC
+    page = max(1, page)
     urls = (
-        FetchUrl(url=f"http://{SVC_PAPER_HOST}:{SVC_PAPER_PORT}/paper", require=True),
+        # 著者の論文はページ分だけを paper サービスから取得する
         FetchUrl(
-            url=f"http://{SVC_AUTHOR_HOST}:{SVC_AUTHOR_PORT}/author", require=True
+            url=author_papers_url(author_uuid, page),
+            require=True,
+            cache_ttl=UPSTREAM_CACHE_TTL_SEC,
         ),
         FetchUrl(
             url=f"http://{SVC_AUTHOR_HOST}:{SVC_AUTHOR_PORT}/author/{author_uuid}",
             require=True,
         ),
     )
-    async with aiohttp.ClientSession(timeout=TIMEOUT) as session:
-        try:
-            json_res = await fetch_all(
-                session=session, urls=urls, x_req_id=x_request_id
+    try:
+        json_res = await fetch_all(
+            session=get_http_session(), urls=urls, x_req_id=x_request_id,
+            deadline=deadline
+        )
+        res_paper_page = json_res[0]
+        total_papers = res_paper_page.get("total") or 0
+        total_pages = max(
+            1, (total_papers + PAPERS_PER_PAGE - 1) // PAPERS_PER_PAGE)
+        if page > total_pages:
+            # 範囲外のページは最終ページを表示する
+            page = total_pages
+            res_paper_page = await cached_http_get(
+                session=get_http_session(),
+                require=True,
+                url=author_papers_url(author_uuid, page),
+                ttl=UPSTREAM_CACHE_TTL_SEC,
+                x_req_id=x_request_id,
             )
-        except aiohttp.ClientResponseError as e:
-            logger.error("Author Single View Error 1: %s", e)
-            if e.code == 404:
-                raise HTTPException(status_code=404)
-            raise HTTPException(status_code=503)
-        except Exception as e:
-            logger.error("Author Single View Error 2: %s", e)
-            raise HTTPException(status_code=503)
+        # 共著者はページ分の論文に含まれる分だけを取得する
+        authors_idx = await fetch_authors(
+            [u for fp in res_paper_page["papers"]
+             for u in fp.get("author_uuid", [])],
+            x_request_id, deadline)
+    except aiohttp.ClientResponseError as e:
+        logger.error("Author Single View Error 1: %s", e)
+        if e.code == 404:
+            raise HTTPException(status_code=404)
+        raise HTTPException(status_code=503)
+    except Exception as e:
+        logger.error("Author Single View Error 2: %s", e)
+        raise HTTPException(status_code=503)
 
-    res_paper = json_res[0]["papers"]
-    res_author = json_res[1]
-    res_author_me = json_res[2]
+    res_paper = res_paper_page["papers"]
+    res_author_me = json_res[1]
 
-    # 著者(author_uuid)を含む論文一覧を取得
-    found_paper = list(
-        filter(lambda x: str(author_uuid) in x["author_uuid"], res_paper)
-    )
-    paper_details = []
-    for fp in found_paper:
+    paged_paper_details = []
+    for fp in res_paper:
         # 個々の論文の著者ID(uuid)を氏名に変換
-        found_author = []
-        for uuid in fp.get("author_uuid"):
-            candidates = filter(lambda x: uuid == x.get("uuid"), res_author)
-            candidates_lst = list(candidates)
-            if len(candidates_lst) > 0:
-                author = candidates_lst[0]
-                display_name = (
-                    author.get("last_name_ja") +
-                    " " +
-                    author.get("first_name_ja"))
-                found_author.append(display_name)
-
-        paper_details.append(
+        found_author = authors_idx.names(fp.get("author_uuid"))
+
+        paged_paper_details.append(
             {
                 "uuid": fp.get("uuid", "#"),
                 "title": fp.get("title", "No Title"),
@@ -693,14 +2159,6 @@ async def author_handler(
         "joined_year": res_author_me.get("joined_year"),
     }
 
-    # ページネーション
-    total_papers = len(paper_details)
-    total_pages = max(1, (total_papers + PAPERS_PER_PAGE - 1) // PAPERS_PER_PAGE)
-    page = max(1, min(page, total_pages))
-    start = (page - 1) * PAPERS_PER_PAGE
-    end = start + PAPERS_PER_PAGE
-    paged_paper_details = paper_details[start:end]
-
     return templates.TemplateResponse(
         request,
         "author.html",
@@ -719,26 +2177,43 @@ async def author_handler(
 async def thumbnail_handler(
     paper_uuid: UUID,
     image_id: str,
+    if_none_match: Union[str, None] = Header(default=None),
     x_request_id: Union[UUID, None] = Header(default=None),
 ):
     x_request_id = uuid4() if x_request_id is None else x_request_id
-    async with aiohttp.ClientSession(timeout=TIMEOUT) as session:
-        url = (
-            f"http://{SVC_THUMBNAIL_HOST}:{SVC_THUMBNAIL_PORT}"
-            f"/thumbnail/{paper_uuid}/{image_id}"
+    # 論文ごとの画像は生成後に変わらないため，ブラウザにも長期間保持させる
+    cache_control = f"public, max-age={THUMBNAIL_MAX_AGE_SEC}, immutable"
+    cache_key = (paper_uuid, image_id)
+    cached_img = None
+    if DOWNLOAD_MODE != "redirect":
+        cached_img = thumbnail_cache.get(cache_key)
+    if cached_img is not None:
+        return image_response(cached_img, if_none_match, cache_control)
+
+    url = (
+        f"http://{SVC_THUMBNAIL_HOST}:{SVC_THUMBNAIL_PORT}"
+        f"/thumbnail/{paper_uuid}/{image_id}"
+    )
+    try:
+        if DOWNLOAD_MODE in ("presigned", "redirect"):
+            url = (await presigned_url(f"{url}/url", x_request_id))["url"]
+        if DOWNLOAD_MODE == "redirect":
+            return RedirectResponse(
+                url, status_code=302, headers={"Cache-Control": "no-store"})
+        res_img = await http_get_file(
+            session=get_http_session(), url=url, x_req_id=x_request_id
         )
-        try:
-            res_img = await http_get_file(
-                session=session, url=url, x_req_id=x_request_id
-            )
-        except aiohttp.ClientResponseError as e:
-            logger.error("Thumbnail Download Error 1: %s", e)
-            if e.code == 404:
-                # raise HTTPException(status_code=404)
-                return FileResponse("assets/404.png")
-            raise HTTPException(status_code=503)
-        except Exception as e:
-            logger.error("Thumbnail Download Error 2: %s", e)
-            raise HTTPException(status_code=503)
+    except aiohttp.ClientResponseError as e:
+        logger.error("Thumbnail Download Error 1: %s", e)
+        if e.code == 404:
+            # raise HTTPException(status_code=404)
+            # 後から画像が生成されることもあるため代替画像は短期間だけ保持させる
+            return image_response(
+                not_found_image(), if_none_match, "public, max-age=300")
+        raise HTTPException(status_code=503)
+    except Exception as e:
+        logger.error("Thumbnail Download Error 2: %s", e)
+        raise HTTPException(status_code=503)
 
-    return Response(content=res_img, media_type="image/png")
+    image = thumbnail_cache.put(cache_key, res_img)
+    return image_response(image, if_none_match, cache_control)
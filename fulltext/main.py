@@ -2,7 +2,9 @@ import logging
 import math
 import os
 import socket
+import threading
 import time
+from contextlib import asynccontextmanager
 from typing import List, Literal, Optional
 from uuid import UUID
 
@@ -35,6 +37,15 @@ logger = logging.getLogger(__name__)
 PAPER_SVC_HOST = os.getenv("PAPER_SVC_HOST", "paper-app:8000")
 ELASTICSEARCH_HOST = os.getenv("ELASTICSEARCH_HOST", "fulltext-elastic:9200")
 ELASTICSEARCH_INDEX = os.getenv("ELASTICSEARCH_INDEX", "fulltext")
+# キーワードの一括更新で paper サービスへ1回に送る件数
+KEYWORDS_BATCH_SIZE = int(os.getenv("KEYWORDS_BATCH_SIZE", 500))
+# paper の変更フィードを読むグループ (既定では読まない．指定する場合は
+# front-admin の PAPER_EVENTS_CONSUMERS も true にする)
+EVENTS_GROUP = os.getenv("EVENTS_GROUP", "")
+EVENTS_CONSUMER = os.getenv(
+    "EVENTS_CONSUMER", f"{socket.gethostname()}-{os.getpid()}")
+EVENTS_WAIT_SEC = float(os.getenv("EVENTS_WAIT_SEC", 20))
+EVENTS_RETRY_SEC = float(os.getenv("EVENTS_RETRY_SEC", 5))
 
 # OpenTelemetry TracerProvider の設定
 resource = Resource(attributes={"service.name": "fulltext"})
@@ -167,8 +178,59 @@ def _compute_keywords(paper_uuid: UUID, top_n: int = 10) -> List[str]:
     return [t for t, _ in sorted(scores.items(), key=lambda x: x[1], reverse=True)[:top_n]]
 
 
+def refresh_paper_detail(paper_uuid: UUID):
+    # 論文ページ用の詳細に反映する (失敗しても paper が後で作り直す)
+    try:
+        requests.post(
+            f"http://{PAPER_SVC_HOST}/paper/{paper_uuid}/detail", timeout=10
+        ).raise_for_status()
+    except Exception as e:
+        logger.warning("Fail to refresh paper detail %s: %s", paper_uuid, e)
+
+
+def consume_paper_events(handle):
+    """paper の変更フィードで論文ファイルの登録を受け取り handle を呼ぶ
+
+    イベントごとに読んだ位置を記録する．失敗したイベントはログに残して
+    次へ進む．
+    """
+    events_url = f"http://{PAPER_SVC_HOST}/paper/events"
+    params = {"types": "paper.uploaded", "group": EVENTS_GROUP,
+              "consumer": EVENTS_CONSUMER, "wait": EVENTS_WAIT_SEC}
+    while True:
+        try:
+            res = requests.get(
+                events_url, params=params, timeout=EVENTS_WAIT_SEC + 10)
+            res.raise_for_status()
+            for event in res.json()["events"]:
+                try:
+                    handle(UUID(event["paper_uuid"]))
+                except Exception as e:
+                    logger.error("Fail to handle event %s: %s", event["id"], e)
+                requests.put(
+                    f"{events_url}/groups/{EVENTS_GROUP}",
+                    json={"consumer": EVENTS_CONSUMER, "cursor": event["seq"]},
+                    timeout=10,
+                ).raise_for_status()
+        except Exception as e:
+            # 貸し出しを失った場合も含め，記録した位置から読み直す
+            logger.warning("Fail to consume paper events: %s", e)
+            time.sleep(EVENTS_RETRY_SEC)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if EVENTS_GROUP:
+        threading.Thread(
+            target=consume_paper_events,
+            args=(create_fulltext_handler,),
+            daemon=True,
+        ).start()
+    yield
+
+
 """ FastAPI Setup """
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # FastAPI アプリケーションの計装
 FastAPIInstrumentor.instrument_app(app)
@@ -231,17 +293,34 @@ def refresh_all_keywords_handler():
         if "paper_uuid" in hit["_source"]
     })
     failed = 0
+    updates = []
     for puid in paper_uuids:
         try:
             keywords = _compute_keywords(UUID(puid))
-            requests.patch(
-                f"http://{PAPER_SVC_HOST}/paper/{puid}/keywords",
-                json={"keywords": keywords},
-                timeout=10,
-            )
+            updates.append({"uuid": puid, "keywords": keywords})
         except Exception as e:
-            logger.error("Failed to refresh keywords for %s: %s", puid, e)
+            logger.error("Failed to compute keywords for %s: %s", puid, e)
             failed += 1
+
+    # paper サービスへはまとめて送る
+    for i in range(0, len(updates), KEYWORDS_BATCH_SIZE):
+        batch = updates[i:i + KEYWORDS_BATCH_SIZE]
+        try:
+            res = requests.patch(
+                f"http://{PAPER_SVC_HOST}/paper/keywords/bulk",
+                json={"updates": batch},
+                timeout=30,
+            )
+            res.raise_for_status()
+            for result in res.json()["results"]:
+                if result["status"] != "ok":
+                    logger.error("Failed to refresh keywords for %s: %s",
+                                 result["uuid"], result["message"])
+                    failed += 1
+        except Exception as e:
+            logger.error("Failed to refresh keywords for %d papers: %s",
+                         len(batch), e)
+            failed += len(batch)
     msg = f"Refreshed {len(paper_uuids) - failed}/{len(paper_uuids)} papers"
     logger.info(msg)
     return StatusResponse(status="ok", message=msg)
@@ -254,6 +333,7 @@ def create_fulltext_handler(paper_uuid: UUID):
         file_url = f"http://{PAPER_SVC_HOST}/paper/{paper_uuid}/download"
         logger.info("Fetch url: %s", file_url)
         pdf_data = requests.get(file_url)
+        pdf_data.raise_for_status()
     except Exception as e:
         logger.error("Fail to download: %s", e)
         raise HTTPException(status_code=400,
@@ -272,7 +352,9 @@ def create_fulltext_handler(paper_uuid: UUID):
             }
             logger.info("Insert record: %s", record)
             try:
-                es.index(index=ELASTICSEARCH_INDEX, document=record)
+                # 同じ論文を再び処理しても重複しないようページごとに ID を固定する
+                es.index(index=ELASTICSEARCH_INDEX,
+                         id=f"{paper_uuid}-{i}", document=record)
             except Exception as e:
                 logger.error("Fail to create record: %s", e)
 
@@ -287,6 +369,7 @@ def create_fulltext_handler(paper_uuid: UUID):
     except Exception as e:
         logger.error("Failed to update keywords for %s: %s", paper_uuid, e)
 
+    refresh_paper_detail(paper_uuid)
     return StatusResponse(status="ok", message="Created fulltext")
 
 
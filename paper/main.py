@@ -1,17 +1,28 @@
+import asyncio
+import base64
+import functools
+import hashlib
 import logging
 import os
 import re
 import socket
 import sys
 import time
-from datetime import datetime
-from typing import List, Literal, Optional
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Callable, List, Literal, Optional, Tuple
 from uuid import UUID, uuid4
 
+import orjson
 import urllib3
-from fastapi import FastAPI, File, HTTPException, UploadFile
+from bson import json_util
+from fastapi import (FastAPI, File, Header, HTTPException, Query, Request,
+                     UploadFile)
 from fastapi.encoders import jsonable_encoder
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
 from minio import Minio, S3Error
 from minio.deleteobjects import DeleteObject
 from opentelemetry import trace
@@ -28,9 +39,12 @@ from opentelemetry.sdk._logs.export import BatchLogRecordProcessor
 from opentelemetry.sdk.resources import Resource
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor
-from pydantic import BaseModel
-from pymongo import MongoClient, ReturnDocument
-from pymongo.errors import ConnectionFailure, OperationFailure
+from pydantic import BaseModel, TypeAdapter
+from pymongo import (ASCENDING, DESCENDING, IndexModel, MongoClient,
+                     ReturnDocument, UpdateOne)
+from pymongo.errors import (BulkWriteError, ConnectionFailure,
+                            DuplicateKeyError, OperationFailure)
+from starlette.concurrency import run_in_threadpool
 
 # ログ設定
 logging.basicConfig(level=logging.INFO)
@@ -45,6 +59,56 @@ MINIO_ROOT_USER = os.getenv("MINIO_ROOT_USER", "minio")
 MINIO_ROOT_PASSWORD = os.getenv("MINIO_ROOT_PASSWORD", "minio123")
 MINIO_HOST = os.getenv("MINIO_HOST", "paper-minio:9000")
 MINIO_BUCKET_NAME = os.getenv("MINIO_BUCKET_NAME", "paper")
+# 署名付き URL に使う MinIO のホスト．署名にホストが含まれるため URL を使う側から
+# 届くものを指定する (空なら MINIO_HOST)
+#   MINIO_INTERNAL_HOST: front が MinIO から直接中継するときに使う
+#   MINIO_PUBLIC_HOST: クライアントを MinIO へ転送するときに使う
+MINIO_INTERNAL_HOST = os.getenv("MINIO_INTERNAL_HOST", "")
+MINIO_PUBLIC_HOST = os.getenv("MINIO_PUBLIC_HOST", "")
+MINIO_PUBLIC_SECURE = os.getenv("MINIO_PUBLIC_SECURE", "false") == "true"
+MINIO_REGION = os.getenv("MINIO_REGION", "us-east-1")
+PRESIGNED_URL_TTL_SEC = int(os.getenv("PRESIGNED_URL_TTL_SEC", 300))
+# MinIO の呼び出しはブロッキングのため専用のスレッドで実行する
+MINIO_WORKERS = int(os.getenv("MINIO_WORKERS", 8))
+# イベントループの遅延の計測間隔と警告の閾値
+LOOP_LAG_INTERVAL_SEC = float(os.getenv("LOOP_LAG_INTERVAL_SEC", 0.5))
+LOOP_LAG_WARN_SEC = float(os.getenv("LOOP_LAG_WARN_SEC", 0.1))
+# ダウンロード時に MinIO から1回に読み込むサイズ
+DOWNLOAD_CHUNK_BYTES = int(os.getenv("DOWNLOAD_CHUNK_BYTES", 1024 * 1024))
+# PDF は内容の SHA-256 をキーとして保存し，同じ内容は1つにまとめる
+OBJECT_PREFIX = "sha256/"
+# 一括登録・一括更新で1回に受け付ける件数の上限
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", 1000))
+# uuids で1回に指定できる件数の上限
+MAX_UUIDS = int(os.getenv("MAX_UUIDS", 1000))
+# 変更イベント: 論文の文書に積んだイベントを outbox へ移す間隔と1回の件数
+OUTBOX_RELAY_INTERVAL_SEC = float(os.getenv("OUTBOX_RELAY_INTERVAL_SEC", 0.5))
+OUTBOX_RELAY_BATCH = int(os.getenv("OUTBOX_RELAY_BATCH", 100))
+# 中継を担当するレプリカの貸し出し期間 (切れたら他のレプリカが引き継ぐ)
+OUTBOX_LEASE_SEC = float(os.getenv("OUTBOX_LEASE_SEC", 10))
+# outbox に残す期間
+OUTBOX_RETENTION_DAYS = int(os.getenv("OUTBOX_RETENTION_DAYS", 14))
+# イベントの読み出しで待つ時間の上限と，待つ間の確認間隔
+EVENTS_MAX_WAIT_SEC = float(os.getenv("EVENTS_MAX_WAIT_SEC", 30))
+EVENTS_POLL_INTERVAL_SEC = float(os.getenv("EVENTS_POLL_INTERVAL_SEC", 0.5))
+# group ごとにイベントを受け取る consumer の貸し出し期間
+EVENT_GROUP_LEASE_SEC = float(os.getenv("EVENT_GROUP_LEASE_SEC", 120))
+INSTANCE_ID = f"{socket.gethostname()}-{os.getpid()}-{uuid4().hex[:8]}"
+# 論文ページ用の詳細 (paper_details) の組み立てに使う他のサービス
+SVC_AUTHOR_HOST = os.getenv("SERVICE_AUTHOR_HOST", "author-app")
+SVC_AUTHOR_PORT = os.getenv("SERVICE_AUTHOR_PORT", "8000")
+SVC_THUMBNAIL_HOST = os.getenv("SERVICE_THUMBNAIL_HOST", "thumbnail-app")
+SVC_THUMBNAIL_PORT = os.getenv("SERVICE_THUMBNAIL_PORT", "8000")
+SVC_FULLTEXT_HOST = os.getenv("SERVICE_FULLTEXT_HOST", "fulltext-app")
+SVC_FULLTEXT_PORT = os.getenv("SERVICE_FULLTEXT_PORT", "8000")
+UPSTREAM_TIMEOUT_SEC = float(os.getenv("UPSTREAM_TIMEOUT_SEC", 3))
+# 一部のサービスから取得できなかった詳細は RETRY_SEC から倍々に間隔を
+# 空けて (最大 RETRY_MAX_SEC) 作り直す
+PAPER_DETAIL_RETRY_SEC = float(os.getenv("PAPER_DETAIL_RETRY_SEC", 30))
+PAPER_DETAIL_RETRY_MAX_SEC = float(
+    os.getenv("PAPER_DETAIL_RETRY_MAX_SEC", 3600))
+PAPER_DETAIL_INTERVAL_SEC = float(os.getenv("PAPER_DETAIL_INTERVAL_SEC", 1))
+PAPER_DETAIL_BATCH = int(os.getenv("PAPER_DETAIL_BATCH", 50))
 
 # =============================================================================
 # OpenTelemetry setup
@@ -94,13 +158,404 @@ try:
         secret_key=MINIO_ROOT_PASSWORD,
         secure=False,
     )
+    # 署名は手元で計算するため，リージョンを指定して問い合わせを省く．
+    # 公開用 (public=True) と内部用で別のホストに署名する
+    presign_clients = {
+        False: Minio(
+            MINIO_INTERNAL_HOST or MINIO_HOST,
+            access_key=MINIO_ROOT_USER,
+            secret_key=MINIO_ROOT_PASSWORD,
+            secure=False,
+            region=MINIO_REGION,
+        ),
+        True: Minio(
+            MINIO_PUBLIC_HOST or MINIO_HOST,
+            access_key=MINIO_ROOT_USER,
+            secret_key=MINIO_ROOT_PASSWORD,
+            secure=MINIO_PUBLIC_SECURE,
+            region=MINIO_REGION,
+        ),
+    }
 except (S3Error, urllib3.exceptions.MaxRetryError) as e:
     logger.error(e)
     sys.exit(-1)
 
+minio_executor = ThreadPoolExecutor(
+    max_workers=MINIO_WORKERS, thread_name_prefix="minio")
+# 実行中・待機中の MinIO 呼び出しの数
+minio_inflight = 0
+
+
+async def run_minio(func, *args, **kwargs):
+    """MinIO の呼び出しをイベントループの外で実行する"""
+    global minio_inflight
+    loop = asyncio.get_running_loop()
+    minio_inflight += 1
+    try:
+        return await loop.run_in_executor(
+            minio_executor, functools.partial(func, *args, **kwargs))
+    finally:
+        minio_inflight -= 1
+
+
+class LoopLagMonitor:
+    """イベントループの遅延を計測する
+
+    一定間隔で sleep し，予定より遅れて再開した時間を遅延とみなす．
+    ブロッキングな処理がループ上で実行されると遅延として現れる．
+    """
+
+    def __init__(self, interval: float, warn_sec: float):
+        self.interval = interval
+        self.warn_sec = warn_sec
+        self.last_sec = 0.0
+        self.max_sec = 0.0
+        self.warnings = 0
+
+    async def run(self):
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - started - self.interval)
+            self.last_sec = lag
+            self.max_sec = max(self.max_sec, lag)
+            if lag >= self.warn_sec:
+                self.warnings += 1
+                logger.warning("Event loop lag: %.3f sec", lag)
+
+    def stats(self) -> dict:
+        return {
+            "last_ms": round(self.last_sec * 1000, 3),
+            "max_ms": round(self.max_sec * 1000, 3),
+            "warnings": self.warnings,
+        }
+
+
+loop_lag = LoopLagMonitor(LOOP_LAG_INTERVAL_SEC, LOOP_LAG_WARN_SEC)
+
+
+def run_once(name: str, migrate: Callable):
+    """一度だけでよい移行処理を，済んだ印が無いときだけ実行する
+
+    移行処理はインデックスの無い条件で全件を走査するため，起動のたびには行わない．
+    """
+    if db["migrations"].find_one({"_id": name}) is not None:
+        return
+    migrate()
+    db["migrations"].update_one(
+        {"_id": name},
+        {"$setOnInsert": {"done_at": datetime.now(timezone.utc)}},
+        upsert=True)
+
+
+def normalize_created_at():
+    """文字列で保存された created_at / updated_at を日時型へ揃える
+
+    API経由で登録した論文は日時が文字列で，初期データは日時型で保存されていた．
+    型が混在すると日付での絞り込み・並べ替えをMongoDB側で行えないため統一する．
+    """
+    for field in ("created_at", "updated_at"):
+        res = db["paper"].update_many(
+            {field: {"$type": "string"}},
+            [{"$set": {field: {"$toDate": f"${field}"}}}],
+        )
+        if res.modified_count:
+            logger.info("Normalized %s: %d documents",
+                        field, res.modified_count)
+
+
+def normalize_title(text: str) -> str:
+    # 全角・半角と大文字・小文字の違い，空白を無視して検索する
+    return re.sub(r"\s+", "", unicodedata.normalize("NFKC", text)).lower()
+
+
+def title_ngrams(title: str) -> List[str]:
+    """タイトル検索用の索引語 (1文字と2文字の部分文字列)
+
+    日本語のタイトルは単語に区切れないため，文字の bigram を索引語とする．
+    1文字の検索語にも対応できるよう unigram も含める．
+    """
+    text = normalize_title(title)
+    grams = list(text) + [text[i:i + 2] for i in range(len(text) - 1)]
+    return list(dict.fromkeys(grams))
+
+
+def title_search_fields(title: str) -> dict:
+    return {
+        "title_normalized": normalize_title(title),
+        "title_ngrams": title_ngrams(title),
+    }
+
+
+def title_condition(keyword: str) -> dict:
+    """タイトルに keyword を含む論文の検索条件
+
+    索引語で候補を絞り込んでから，正規化したタイトルとの部分一致で確かめる．
+    """
+    text = normalize_title(keyword)
+    if len(text) < 2:
+        grams = [text]
+    else:
+        grams = list(dict.fromkeys(
+            text[i:i + 2] for i in range(len(text) - 1)))
+    return {
+        "title_ngrams": {"$all": grams},
+        "title_normalized": {"$regex": re.escape(text)},
+    }
+
+
+def index_titles():
+    """タイトル検索の索引語が無い論文に索引語を付与する"""
+    requests = [
+        UpdateOne({"_id": doc["_id"]},
+                  {"$set": title_search_fields(doc.get("title", ""))})
+        for doc in db["paper"].find(
+            {"title_ngrams": {"$exists": False}}, {"title": 1})
+    ]
+    if requests:
+        res = db["paper"].bulk_write(requests, ordered=False)
+        logger.info("Indexed titles: %d documents", res.modified_count)
+
+
+# コレクションごとのインデックス定義
+INDEXES = {
+    "paper": [
+        IndexModel([("uuid", ASCENDING)], name="uuid", unique=True),
+        # 公開論文の一覧 (既定の並び順はラベルの降順)
+        IndexModel(
+            [("is_public", ASCENDING), ("label", DESCENDING),
+             ("_id", DESCENDING)],
+            name="is_public_label"),
+        IndexModel(
+            [("is_public", ASCENDING), ("created_at", DESCENDING),
+             ("_id", DESCENDING)],
+            name="is_public_created_at"),
+        # author_uuid は配列のため複数キーインデックスになる
+        IndexModel([("author_uuid", ASCENDING)], name="author_uuid"),
+        IndexModel([("title_ngrams", ASCENDING)], name="title_ngrams"),
+        # outbox へ移していないイベントを持つ論文だけを索引に含める
+        IndexModel(
+            [("pending_events.id", ASCENDING)],
+            name="pending_events",
+            partialFilterExpression={"pending_events.id": {"$exists": True}}),
+    ],
+    "outbox": [
+        IndexModel([("seq", ASCENDING)], name="seq", unique=True),
+        IndexModel([("id", ASCENDING)], name="event_id", unique=True),
+        IndexModel([("type", ASCENDING), ("seq", ASCENDING)], name="type_seq"),
+        IndexModel([("at", ASCENDING)], name="retention",
+                   expireAfterSeconds=OUTBOX_RETENTION_DAYS * 86400),
+    ],
+    "paper_details": [
+        IndexModel([("uuid", ASCENDING)], name="uuid", unique=True),
+        # 作り直しを待つ (不完全な) 詳細だけを索引に含める
+        IndexModel(
+            [("retry_at", ASCENDING)],
+            name="retry_at",
+            partialFilterExpression={"retry_at": {"$exists": True}}),
+    ],
+}
+
+# 実行計画を確認する頻出クエリ (名前, コレクション, 条件, 並び順)
+HOT_QUERIES = [
+    ("read_paper", "paper", {"uuid": uuid4(), "is_public": True}, None),
+    ("read_papers", "paper", {"is_public": True},
+     [("label", DESCENDING), ("_id", DESCENDING)]),
+    ("read_papers_by_date", "paper", {"is_public": True},
+     [("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ("read_papers_by_author", "paper",
+     {"author_uuid": str(uuid4()), "is_public": True},
+     [("label", DESCENDING), ("_id", DESCENDING)]),
+    ("search_papers", "paper",
+     dict(title_condition("論文"), is_public=True), None),
+    ("pending_events", "paper", {"pending_events.id": {"$exists": True}},
+     None),
+    ("read_events", "outbox",
+     {"type": {"$in": ["paper.uploaded"]}, "seq": {"$gt": 0}},
+     [("seq", ASCENDING)]),
+    ("read_paper_detail", "paper_details",
+     {"uuid": uuid4(), "is_public": True}, None),
+    ("retry_paper_details", "paper_details",
+     {"retry_at": {"$lt": datetime.now(timezone.utc)}}, None),
+]
+
+
+def ensure_indexes():
+    """インデックスを作成する
+
+    定義が同じインデックスは作成済みなら何もしないため，起動のたびに実行してよい．
+    1つの作成に失敗しても残りは作成する．
+    """
+    for collection, indexes in INDEXES.items():
+        for index in indexes:
+            try:
+                db[collection].create_indexes([index])
+            except OperationFailure as e:
+                logger.error("Fail to create index %s.%s: %s",
+                             collection, index.document["name"], e)
+
+
+def plan_stages(plan: dict):
+    yield plan.get("stage")
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from plan_stages(child)
+
+
+def check_query_plans() -> List[str]:
+    """頻出クエリのうち全件走査 (COLLSCAN) になるものを返す"""
+    collscans = []
+    for name, collection, query, sort in HOT_QUERIES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = cursor.explain()["queryPlanner"]["winningPlan"]
+        if "COLLSCAN" in plan_stages(plan):
+            logger.warning("COLLSCAN in hot query: %s", name)
+            collscans.append(name)
+    return collscans
+
+
+def paper_event(event_type: str, paper_uuid: UUID, **data) -> dict:
+    """論文の文書に積む変更イベント
+
+    データの変更と同じ1文書の書き込みで積むことで変更と原子的に記録し，
+    run_outbox_relay() が outbox コレクションへ連番を付けて移す．
+    """
+    return {
+        "id": str(uuid4()),
+        "type": event_type,
+        "paper_uuid": paper_uuid,
+        "at": datetime.now(timezone.utc),
+        "data": data,
+    }
+
+
+def acquire_lease(name: str, owner: str, ttl: float) -> bool:
+    """name の貸し出しを owner が取得 (延長) できれば True を返す"""
+    now = datetime.now(timezone.utc)
+    try:
+        db["leases"].find_one_and_update(
+            {"_id": name,
+             "$or": [{"owner": owner}, {"expires_at": {"$lt": now}}]},
+            {"$set": {"owner": owner,
+                      "expires_at": now + timedelta(seconds=ttl)}},
+            upsert=True)
+        return True
+    except DuplicateKeyError:
+        # 他の owner が貸し出し中 (条件に合わず同じ _id で追加しようとした)
+        return False
+
+
+def last_outbox_seq() -> int:
+    last = db["outbox"].find_one({}, {"seq": 1}, sort=[("seq", DESCENDING)])
+    if last is not None:
+        return last["seq"]
+    counter = db["counters"].find_one({"_id": "outbox_seq"})
+    return counter["seq"] if counter else 0
+
+
+def relay_outbox() -> int:
+    """論文の文書に積まれたイベントを outbox へ移し，移した論文の数を返す
+
+    連番は outbox の最大の seq の次とし，seq の一意インデックスで衝突を
+    検出する．貸し出しが切れた後に止まっていたレプリカが動き出しても，
+    他のレプリカが追加した seq より小さい番号では追加できない．追加した
+    後に論文から取り除く前に止まっても，次の中継で同じイベントは追加
+    されずに取り除かれる．
+    """
+    if not acquire_lease("outbox-relay", INSTANCE_ID, OUTBOX_LEASE_SEC):
+        return 0
+    papers = list(db["paper"].find(
+        {"pending_events.id": {"$exists": True}},
+        {"pending_events": 1},
+    ).limit(OUTBOX_RELAY_BATCH))
+    events = sorted(
+        (event for paper in papers for event in paper["pending_events"]),
+        key=lambda event: event["at"])
+    if not events:
+        return 0
+
+    seq = last_outbox_seq()
+    first_seq = seq + 1
+    for event in events:
+        while True:
+            try:
+                db["outbox"].insert_one({**event, "seq": seq + 1})
+                seq += 1
+                break
+            except DuplicateKeyError:
+                if db["outbox"].count_documents(
+                        {"id": event["id"]}, limit=1) > 0:
+                    logger.info("Event already relayed: %s", event["id"])
+                    break
+                # 他のレプリカが先に追加したため最新の seq から数え直す
+                seq = last_outbox_seq()
+    # 保持期間で outbox が空になっても連番を戻さないために記録する
+    db["counters"].update_one(
+        {"_id": "outbox_seq"}, {"$max": {"seq": seq}}, upsert=True)
+    for paper in papers:
+        event_ids = [event["id"] for event in paper["pending_events"]]
+        db["paper"].update_one(
+            {"_id": paper["_id"]},
+            {"$pull": {"pending_events": {"id": {"$in": event_ids}}}})
+    logger.info("Relayed %d events (seq %d-%d)", len(events), first_seq, seq)
+    return len(papers)
+
+
+async def run_outbox_relay():
+    while True:
+        try:
+            relayed = await run_in_threadpool(relay_outbox)
+        except Exception as e:
+            logger.error("Fail to relay outbox: %s", e)
+            relayed = 0
+        # 積み残しがあれば待たずに続ける
+        if relayed < OUTBOX_RELAY_BATCH:
+            await asyncio.sleep(OUTBOX_RELAY_INTERVAL_SEC)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        run_once("normalize_created_at", normalize_created_at)
+    except Exception as e:
+        logger.error("Fail to normalize created_at: %s", e)
+    try:
+        run_once("index_titles", index_titles)
+    except Exception as e:
+        logger.error("Fail to index titles: %s", e)
+    try:
+        ensure_indexes()
+        check_query_plans()
+    except Exception as e:
+        logger.error("Fail to provision indexes: %s", e)
+    try:
+        # 起動前に書き込まれていても古い ETag と一致しないよう版を進める
+        bump_version(VERSIONED_COLLECTION)
+    except Exception as e:
+        logger.error("Fail to initialize collection version: %s", e)
+    loop_lag_task = asyncio.create_task(loop_lag.run())
+    relay_task = asyncio.create_task(run_outbox_relay())
+    detail_task = asyncio.create_task(run_detail_builder())
+    yield
+    tasks = (detail_task, relay_task, loop_lag_task)
+    for task in tasks:
+        task.cancel()
+    for task in tasks:
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    # 実行中の MinIO・上流の呼び出しが終わってから閉じる
+    minio_executor.shutdown(wait=True)
+    upstream_executor.shutdown(wait=True)
+
 
 """ FastAPI Setup """
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # FastAPI アプリケーションの計装
 FastAPIInstrumentor.instrument_app(app)
@@ -128,6 +583,12 @@ class PaperCreateUpdate(BaseModel):
     updated_at: Optional[datetime] = datetime.now()
 
 
+class PaperFile(BaseModel):
+    sha256: str
+    size: int
+    pages: Optional[int] = None
+
+
 class PaperRead(BaseModel):
     uuid: UUID
     author_uuid: List[UUID]
@@ -137,6 +598,7 @@ class PaperRead(BaseModel):
     created_at: datetime
     updated_at: Optional[datetime] = datetime.now()
     keywords: List[str] = []
+    file: Optional[PaperFile] = None
     # todo) reference_id: List[int]
 
 
@@ -146,6 +608,205 @@ class PaperKeywordsUpdate(BaseModel):
 
 class PaperReadSeveral(BaseModel):
     papers: List[PaperRead]
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
+    # uuids で指定されたうち見つからなかった論文
+    missing: Optional[List[UUID]] = None
+
+
+class PaperCreateSeveral(BaseModel):
+    papers: List[PaperCreateUpdate]
+
+
+class PaperKeywordsUpdateItem(BaseModel):
+    uuid: UUID
+    keywords: List[str]
+
+
+class PaperKeywordsUpdateSeveral(BaseModel):
+    updates: List[PaperKeywordsUpdateItem]
+
+
+class BulkItemResult(BaseModel):
+    # リクエスト中の位置
+    index: int
+    uuid: Optional[UUID] = None
+    status: Literal["ok", "error"]
+    message: Optional[str] = ""
+
+
+EVENT_TYPES = ("paper.created", "paper.uploaded", "paper.updated")
+
+
+class PaperEvent(BaseModel):
+    seq: int
+    id: str
+    type: str
+    paper_uuid: UUID
+    at: datetime
+    data: dict = {}
+
+
+class PaperEventSeveral(BaseModel):
+    events: List[PaperEvent]
+    # 続きを読むときに after へ渡す値
+    next_cursor: int
+
+
+class EventGroupCommit(BaseModel):
+    consumer: str
+    cursor: int
+
+
+class PaperDetailAuthor(BaseModel):
+    uuid: str
+    name: str
+
+
+class PaperDetail(BaseModel):
+    """論文ページの表示に必要な情報をまとめた詳細"""
+    uuid: UUID
+    title: str
+    label: str
+    is_public: bool
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    keywords: List[str] = []
+    authors: List[PaperDetailAuthor] = []
+    abstract: str = ""
+    # サムネイル画像の ID (thumbnail の /thumbnail/{paper_uuid}/{image_id})
+    thumbnails: List[str] = []
+    pages: Optional[int] = None
+    built_at: datetime
+    # 全てのサービスから取得できたか
+    complete: bool = True
+
+
+class PresignedUrl(BaseModel):
+    url: str
+    # 有効期間の残り秒数
+    expires_in: int
+    # paper 経由で返すものと同じ検証子 (MinIO の ETag は MD5 のため使わない)
+    etag: str
+    last_modified: Optional[str] = None
+
+
+class BulkResults(BaseModel):
+    ok: int
+    failed: int
+    results: List[BulkItemResult]
+
+
+def bulk_results(uuids: List[UUID], errors: dict) -> BulkResults:
+    results = [
+        BulkItemResult(index=i, uuid=uuid, status="error", message=errors[i])
+        if i in errors else
+        BulkItemResult(index=i, uuid=uuid, status="ok")
+        for i, uuid in enumerate(uuids)
+    ]
+    return BulkResults(
+        ok=len(uuids) - len(errors), failed=len(errors), results=results)
+
+
+def check_bulk_size(items: list):
+    if len(items) > BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many items (max {BULK_MAX_ITEMS})")
+
+
+# 並べ替えの指定と対応するフィールド・順序
+PAPER_SORTS = {
+    "label_desc": ("label", DESCENDING),
+    "date_desc": ("created_at", DESCENDING),
+    "date_asc": ("created_at", ASCENDING),
+}
+
+
+def encode_cursor(doc: dict, sort_field: str) -> str:
+    raw = json_util.dumps({"k": doc.get(sort_field), "id": doc["_id"]})
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        decoded = json_util.loads(raw)
+        return {"k": decoded["k"], "id": decoded["id"]}
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_condition(cursor: dict, sort_field: str, direction: int) -> dict:
+    # (並べ替えキー, _id) の組で直前のページの続きから取得する
+    op = "$lt" if direction == DESCENDING else "$gt"
+    return {
+        "$or": [
+            {sort_field: {op: cursor["k"]}},
+            {sort_field: cursor["k"], "_id": {op: cursor["id"]}},
+        ]
+    }
+
+
+# 版を数えるコレクション (書き込みのたびに版を進め，読み出しの ETag に使う)
+VERSIONED_COLLECTION = "paper"
+
+
+def is_event_path(path: str) -> bool:
+    return path == "/paper/events" or path.startswith("/paper/events/")
+
+
+def is_detail_path(path: str) -> bool:
+    return path.startswith("/paper/") and path.endswith("/detail")
+
+
+def is_versioned_path(path: str) -> bool:
+    # 論文ファイルのダウンロードは内容のハッシュを ETag とし，署名付き URL は
+    # 期限があるため対象外．変更イベントと論文ページ用の詳細も論文の版とは
+    # 別に変わるため対象外
+    if (path.endswith(("/download", "/download/url")) or is_event_path(path)
+            or is_detail_path(path)):
+        return False
+    return path == "/paper" or path.startswith("/paper/")
+
+
+def collection_version(name: str) -> str:
+    """コレクションの版 (エポックと変更回数) を返す"""
+    entry = db["versions"].find_one({"_id": name})
+    if entry is None:
+        return "0"
+    return f"{entry.get('epoch', '')}.{entry['version']}"
+
+
+def bump_version(name: str):
+    # 書き込みの後に進め，新しい版に古い内容が結び付かないようにする
+    db["versions"].update_one(
+        {"_id": name},
+        {"$inc": {"version": 1}, "$setOnInsert": {"epoch": uuid4().hex}},
+        upsert=True)
+
+
+def version_etag(version: str, request: Request) -> str:
+    # 同じ版でも一覧の条件ごとに内容が異なるため URL も含める
+    key = f"{version} {request.url.path}?{request.url.query}"
+    return '"' + hashlib.sha1(key.encode()).hexdigest() + '"'
+
+
+@app.middleware("http")
+async def etag_middleware(request: Request, call_next):
+    """論文の読み出しに版から求めた ETag を付け，一致すれば 304 を返す"""
+    if request.method not in ("GET", "HEAD") or \
+            not is_versioned_path(request.url.path):
+        return await call_next(request)
+
+    version = await run_in_threadpool(collection_version, VERSIONED_COLLECTION)
+    etag = version_etag(version, request)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response = await call_next(request)
+    if response.status_code == 200:
+        response.headers["ETag"] = etag
+    return response
 
 
 @app.get("/", response_model=ServiceHello)
@@ -163,25 +824,257 @@ def topz_handler():
     return ServiceHealth(resource="busy")
 
 
-@app.post("/paper", response_model=PaperRead)
-def create_paper_handler(paper: PaperCreateUpdate):
+@app.get("/statz")
+async def statz_handler():
+    # 負荷試験時のチューニング用に内部の統計情報を返す
+    return {
+        "event_loop_lag": loop_lag.stats(),
+        "minio_pool": {
+            "workers": MINIO_WORKERS,
+            "inflight": minio_inflight,
+        },
+    }
+
+
+def new_paper_document(paper: PaperCreateUpdate) -> dict:
     json_paper = jsonable_encoder(paper)
-    my_paper = {
-        "uuid": uuid4(),
+    paper_uuid = uuid4()
+    return {
+        "uuid": paper_uuid,
         "author_uuid": json_paper.get("author_uuid"),
         "title": json_paper.get("title"),
         "label": json_paper.get("label"),
         "is_public": json_paper.get("is_public"),
-        "created_at": json_paper.get("created_at"),
-        "updated_at": json_paper.get("updated_at"),
+        # 日付での絞り込み・並べ替えのため日時型で保存する
+        "created_at": paper.created_at,
+        "updated_at": paper.updated_at,
+        **title_search_fields(paper.title),
+        "pending_events": [paper_event("paper.created", paper_uuid)],
     }
+
+
+@app.post("/paper", response_model=PaperRead)
+def create_paper_handler(paper: PaperCreateUpdate):
+    my_paper = new_paper_document(paper)
     insert_id = db["paper"].insert_one(my_paper).inserted_id
+    bump_version(VERSIONED_COLLECTION)
     logger.info("insert_id: %s", insert_id)
     return PaperRead(**my_paper)
 
 
+@app.post("/paper/bulk", response_model=BulkResults)
+def create_papers_bulk_handler(body: PaperCreateSeveral):
+    check_bulk_size(body.papers)
+    my_papers = [new_paper_document(paper) for paper in body.papers]
+    if not my_papers:
+        return bulk_results([], {})
+
+    # 順序を問わず登録し，失敗した論文があっても残りは登録する
+    errors = {}
+    try:
+        db["paper"].insert_many(my_papers, ordered=False)
+    except BulkWriteError as e:
+        errors = {err["index"]: err["errmsg"]
+                  for err in e.details.get("writeErrors", [])}
+    finally:
+        # 一部だけ登録できた場合も版を進める
+        bump_version(VERSIONED_COLLECTION)
+    logger.info("insert count: %d", len(my_papers) - len(errors))
+    return bulk_results([paper["uuid"] for paper in my_papers], errors)
+
+
+# 正規形 (小文字・ハイフン区切り) の UUID 文字列
+CANONICAL_UUID = re.compile(
+    r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+
+
+class FastPathMiss(Exception):
+    pass
+
+
+def json_uuid(value):
+    # UUID はそのまま orjson に渡し，文字列は正規形のときだけ受け付ける
+    if type(value) is UUID:
+        return value
+    if type(value) is str and CANONICAL_UUID.fullmatch(value):
+        return value
+    raise FastPathMiss
+
+
+def json_datetime(value):
+    # タイムゾーン付きは pydantic と表記が異なるため扱わない
+    if type(value) is datetime and value.tzinfo is None:
+        return value
+    raise FastPathMiss
+
+
+def json_type(value, expected: type):
+    if type(value) is expected:
+        return value
+    raise FastPathMiss
+
+
+def paper_file_value(value):
+    if value is None:
+        return None
+    if type(value) is not dict:
+        raise FastPathMiss
+    pages = value.get("pages")
+    return {
+        "sha256": json_type(value["sha256"], str),
+        "size": json_type(value["size"], int),
+        "pages": None if pages is None else json_type(pages, int),
+    }
+
+
+def json_keywords(value):
+    for keyword in json_type(value, list):
+        json_type(keyword, str)
+    return value
+
+
+# PaperRead の項目ごとの変換 (型が想定どおりでなければ FastPathMiss)
+PAPER_FAST_VALUES = {
+    "uuid": json_uuid,
+    "author_uuid": lambda v: [json_uuid(u) for u in json_type(v, list)],
+    "title": lambda v: json_type(v, str),
+    "label": lambda v: json_type(v, str),
+    "is_public": lambda v: json_type(v, bool),
+    "created_at": json_datetime,
+    "updated_at": lambda v: None if v is None else json_datetime(v),
+    "keywords": json_keywords,
+    "file": paper_file_value,
+}
+PAPER_FIELD_ADAPTERS = {
+    name: TypeAdapter(field.annotation)
+    for name, field in PaperRead.model_fields.items()
+}
+PAPER_FIELDS = tuple(PaperRead.model_fields)
+# 項目ごとの (変換, 既定値)．必須の項目の既定値は REQUIRED とする
+REQUIRED = object()
+PAPER_FIELD_SPECS = {
+    name: (PAPER_FAST_VALUES[name],
+           REQUIRED if field.is_required() else field.default)
+    for name, field in PaperRead.model_fields.items()
+}
+
+
+def paper_value(doc: dict, fields: Tuple[str, ...] = PAPER_FIELDS) -> dict:
+    """Mongo の文書を PaperRead と同じ項目・順序の dict にする
+
+    fields を指定すればその項目だけにする．型が想定どおりでない項目は
+    PaperRead と同じ型で検証・変換した結果を使う．
+    """
+    value = {}
+    for name in fields:
+        convert, default = PAPER_FIELD_SPECS[name]
+        raw = doc.get(name, default)
+        if raw is REQUIRED:
+            raise KeyError(name)
+        try:
+            value[name] = convert(raw)
+        except FastPathMiss:
+            adapter = PAPER_FIELD_ADAPTERS[name]
+            value[name] = adapter.dump_python(
+                adapter.validate_python(raw), mode="json")
+    return value
+
+
+def papers_response(
+        docs,
+        total: Optional[int] = None,
+        next_cursor: Optional[str] = None,
+        missing: Optional[List[UUID]] = None,
+        fields: Tuple[str, ...] = PAPER_FIELDS) -> Response:
+    """論文一覧を PaperReadSeveral と同じ JSON のバイト列で返す
+
+    文書ごとに PaperRead を作って検証・再エンコードする代わりに，
+    文書を直接 orjson で JSON にする．
+    """
+    body = orjson.dumps({
+        "papers": [paper_value(doc, fields) for doc in docs],
+        "total": total,
+        "next_cursor": next_cursor,
+        "missing": missing,
+    })
+    return Response(content=body, media_type="application/json")
+
+
+def parse_fields(fields: str) -> Tuple[str, ...]:
+    """fields=a,b,c を PaperRead の項目順に並べて返す (uuid は常に含める)"""
+    if not fields:
+        return PAPER_FIELDS
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested - set(PAPER_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    requested.add("uuid")
+    return tuple(f for f in PAPER_FIELDS if f in requested)
+
+
+def paper_projection(fields: Tuple[str, ...], *extra: str) -> Optional[dict]:
+    # 全項目を返す場合は従来どおり射影しない
+    if fields == PAPER_FIELDS:
+        return None
+    projection = {f: 1 for f in fields}
+    for f in extra:
+        projection[f] = 1
+    return projection
+
+
+def parse_uuids(uuids: str) -> List[UUID]:
+    """カンマ区切りの UUID を指定された順に重複を除いて返す"""
+    try:
+        parsed = list(dict.fromkeys(
+            UUID(u.strip()) for u in uuids.split(",") if u.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid uuids")
+    if len(parsed) > MAX_UUIDS:
+        raise HTTPException(
+            status_code=400, detail=f"Too many uuids (max {MAX_UUIDS})")
+    return parsed
+
+
+def read_papers_by_uuids(
+        uuids: List[UUID],
+        private: bool,
+        fields: Tuple[str, ...] = PAPER_FIELDS) -> Response:
+    query = {"uuid": {"$in": uuids}}
+    if not private:
+        query["is_public"] = True
+    found = {
+        entry["uuid"]: entry
+        for entry in db["paper"].find(query, paper_projection(fields))
+    }
+    return papers_response(
+        [found[u] for u in uuids if u in found],
+        missing=[u for u in uuids if u not in found],
+        fields=fields,
+    )
+
+
 @app.get("/paper", response_model=PaperReadSeveral)
-def read_papers_handler(private: bool = False, title: str = ""):
+def read_papers_handler(
+    private: bool = False,
+    title: str = "",
+    limit: Optional[int] = Query(default=None, ge=1, le=1000),
+    offset: int = Query(default=0, ge=0),
+    cursor: str = "",
+    sort: Literal["label_desc", "date_desc", "date_asc"] = "label_desc",
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    author_uuid: Optional[UUID] = None,
+    uuids: str = "",
+    fields: str = "",
+):
+    # fields が指定されればその項目だけを読み出して返す
+    _fields = parse_fields(fields)
+    # uuids が指定されればその論文だけを指定された順に返す
+    if uuids:
+        return read_papers_by_uuids(parse_uuids(uuids), private, _fields)
+
     query = {"is_public": True}
     if private:
         del query["is_public"]
@@ -192,11 +1085,391 @@ def read_papers_handler(private: bool = False, title: str = ""):
         if validate is None:
             raise HTTPException(status_code=400, detail="Invalid input")
         else:
-            query["title"] = {"$regex": title}
+            query.update(title_condition(_title))
+
+    if created_from or created_to:
+        created_range = {}
+        if created_from:
+            created_range["$gte"] = created_from
+        if created_to:
+            created_range["$lte"] = created_to
+        query["created_at"] = created_range
+
+    if author_uuid:
+        query["author_uuid"] = str(author_uuid)
+
+    # ページングの有無に関わらず件数は絞り込み条件のみで数える
+    total = None
+    if limit is not None:
+        total = db["paper"].count_documents(query)
+
+    sort_field, direction = PAPER_SORTS[sort]
+    find_query = query
+    if cursor:
+        find_query = {
+            "$and": [
+                query,
+                keyset_condition(decode_cursor(cursor), sort_field, direction),
+            ]
+        }
+
+    # 次ページのカーソルを作るため並べ替えの項目も読み出す
+    found_papers = db["paper"].find(
+        find_query, paper_projection(_fields, sort_field)
+    ).sort([(sort_field, direction), ("_id", direction)])
+    if limit is not None:
+        if not cursor:
+            found_papers = found_papers.skip(offset)
+        found_papers = found_papers.limit(limit)
+
+    docs = list(found_papers)
+    next_cursor = None
+    if limit is not None and len(docs) == limit:
+        next_cursor = encode_cursor(docs[-1], sort_field)
+
+    return papers_response(
+        docs, total=total, next_cursor=next_cursor, fields=_fields)
+
+
+@app.get("/paper/search", response_model=PaperReadSeveral)
+def search_papers_handler(
+    q: str,
+    limit: int = Query(default=20, ge=1, le=1000),
+    offset: int = Query(default=0, ge=0),
+    fields: str = "",
+):
+    _fields = parse_fields(fields)
+    _q = q.strip()
+    validate = re.search("^[0-9a-zA-Zあ-んァ-ン一-鿐ー]+$", _q)
+    if validate is None:
+        raise HTTPException(status_code=400, detail="Invalid input")
+
+    query = title_condition(_q)
+    query["is_public"] = True
+    total = db["paper"].count_documents(query)
+
+    # タイトルが検索語で始まるもの，タイトルに占める検索語の割合が大きいものを上位とする
+    text = normalize_title(_q)
+    score = {
+        "$add": [
+            {"$cond": [
+                {"$eq": [{"$indexOfCP": ["$title_normalized", text]}, 0]},
+                1, 0]},
+            {"$divide": [
+                len(text),
+                {"$max": [1, {"$strLenCP": "$title_normalized"}]}]},
+        ]
+    }
+    pipeline = [
+        {"$match": query},
+        {"$addFields": {"score": score}},
+        {"$sort": {"score": DESCENDING, "created_at": DESCENDING,
+                   "_id": DESCENDING}},
+        {"$skip": offset},
+        {"$limit": limit},
+    ]
+    projection = paper_projection(_fields)
+    if projection is not None:
+        pipeline.append({"$project": projection})
+    found_papers = db["paper"].aggregate(pipeline)
+
+    return papers_response(found_papers, total=total, fields=_fields)
+
+
+@app.get("/paper/author/{author_uuid}", response_model=PaperReadSeveral)
+def read_papers_by_author_handler(
+    author_uuid: UUID,
+    private: bool = False,
+    limit: int = Query(default=20, ge=1, le=1000),
+    offset: int = Query(default=0, ge=0),
+    sort: Literal["label_desc", "date_desc", "date_asc"] = "label_desc",
+    fields: str = "",
+):
+    _fields = parse_fields(fields)
+    # author_uuid のインデックスで該当著者の論文だけを読み出す
+    query = {"author_uuid": str(author_uuid)}
+    if not private:
+        query["is_public"] = True
+
+    total = db["paper"].count_documents(query)
+    sort_field, direction = PAPER_SORTS[sort]
+    found_papers = db["paper"].find(query, paper_projection(_fields)).sort(
+        [(sort_field, direction), ("_id", direction)]
+    ).skip(offset).limit(limit)
+
+    return papers_response(found_papers, total=total, fields=_fields)
+
+
+def parse_event_types(types: str) -> List[str]:
+    _types = [t for t in types.replace(" ", "").split(",") if t]
+    for event_type in _types:
+        if event_type not in EVENT_TYPES:
+            raise HTTPException(
+                status_code=400, detail=f"Unknown event type: {event_type}")
+    return _types
+
+
+def group_cursor(group: str) -> int:
+    entry = db["event_groups"].find_one({"_id": group})
+    return entry["cursor"] if entry else 0
+
+
+def read_events(after: int, limit: int, types: List[str]) -> List[dict]:
+    query = {"seq": {"$gt": after}}
+    if types:
+        query["type"] = {"$in": types}
+    return list(db["outbox"].find(query, {"_id": 0})
+                .sort("seq", ASCENDING).limit(limit))
+
+
+@app.get("/paper/events", response_model=PaperEventSeveral)
+async def read_paper_events_handler(
+    after: Optional[int] = Query(default=None, ge=0),
+    limit: int = Query(default=100, ge=1, le=1000),
+    wait: float = Query(default=0, ge=0, le=EVENTS_MAX_WAIT_SEC),
+    types: str = "",
+    group: str = "",
+    consumer: str = "",
+):
+    """論文の変更イベントを seq の順に返す (変更フィード)
+
+    wait 秒までは新しいイベントを待つ (long-poll)．next_cursor を次の
+    after に渡せば続きから読める．group を指定すると，同じグループの
+    consumer のうち貸し出しを得た1つだけに配り，after を省略すると
+    PUT /paper/events/groups/{group} で記録した位置から読む．
+    """
+    _types = parse_event_types(types)
+    deadline = time.monotonic() + wait
+    if group:
+        if not consumer:
+            raise HTTPException(
+                status_code=400, detail="consumer is required with group")
+        while not await run_in_threadpool(
+                acquire_lease, f"events:{group}", consumer,
+                EVENT_GROUP_LEASE_SEC):
+            # 他の consumer が読んでいる間は何も返さない
+            if time.monotonic() >= deadline:
+                cursor = await run_in_threadpool(group_cursor, group)
+                return PaperEventSeveral(events=[], next_cursor=cursor)
+            await asyncio.sleep(EVENTS_POLL_INTERVAL_SEC)
+        if after is None:
+            after = await run_in_threadpool(group_cursor, group)
+    if after is None:
+        after = 0
+
+    while True:
+        events = await run_in_threadpool(read_events, after, limit, _types)
+        if events or time.monotonic() >= deadline:
+            break
+        await asyncio.sleep(EVENTS_POLL_INTERVAL_SEC)
+    next_cursor = events[-1]["seq"] if events else after
+    return PaperEventSeveral(events=events, next_cursor=next_cursor)
 
-    found_papers = db["paper"].find(query, {"_id": 0}).sort("label", -1)
-    read_papers = list(map(lambda x: PaperRead(**x), found_papers))
-    return PaperReadSeveral(papers=read_papers)
+
+@app.put("/paper/events/groups/{group}", response_model=StatusResponse)
+def commit_event_group_handler(group: str, body: EventGroupCommit):
+    # 貸し出しを持つ consumer だけが読んだ位置を進められる
+    if not acquire_lease(f"events:{group}", body.consumer,
+                         EVENT_GROUP_LEASE_SEC):
+        raise HTTPException(status_code=409, detail="Lease held by another")
+    db["event_groups"].update_one(
+        {"_id": group},
+        {"$max": {"cursor": body.cursor},
+         "$set": {"consumer": body.consumer,
+                  "updated_at": datetime.now(timezone.utc)}},
+        upsert=True)
+    return StatusResponse(status="ok", message=str(body.cursor))
+
+
+upstream_http = urllib3.PoolManager(
+    maxsize=8,
+    timeout=urllib3.Timeout(total=UPSTREAM_TIMEOUT_SEC),
+    retries=False,
+)
+upstream_executor = ThreadPoolExecutor(
+    max_workers=4, thread_name_prefix="upstream")
+
+
+def fetch_upstream(url: str) -> Tuple[bool, Optional[dict]]:
+    """他のサービスから JSON を取得する
+
+    取得できたかと本文を返す．404 は取得できたとして本文を None とする．
+    """
+    try:
+        res = upstream_http.request("GET", url)
+    except Exception as e:
+        logger.warning("Fail to fetch %s: %s", url, e)
+        return False, None
+    if res.status == 404:
+        return True, None
+    if res.status != 200:
+        logger.warning("Invalid status %d on %s", res.status, url)
+        return False, None
+    return True, orjson.loads(res.data)
+
+
+def extract_abstract(text: str) -> str:
+    # 1ページ目の「概要：」から「1.はじめに」の前まで
+    starts = text.find("概要：") + len("概要：")
+    ends = text.find("1.はじめに")
+    if ends == -1:
+        ends = 400
+    return text[starts:ends]
+
+
+def build_paper_detail(paper: dict, retries: int = 0) -> dict:
+    """論文と他のサービスの情報から論文ページ用の詳細を組み立てる
+
+    ダウンロード数は頻繁に変わるため含めない (front が stats から得る)．
+    """
+    paper_uuid = paper["uuid"]
+    author_uuids = [str(u) for u in paper.get("author_uuid", [])]
+    urls = [
+        f"http://{SVC_AUTHOR_HOST}:{SVC_AUTHOR_PORT}/author"
+        f"?uuids={','.join(author_uuids)}&fields=first_name_ja,last_name_ja",
+        f"http://{SVC_THUMBNAIL_HOST}:{SVC_THUMBNAIL_PORT}"
+        f"/thumbnail/{paper_uuid}",
+        f"http://{SVC_FULLTEXT_HOST}:{SVC_FULLTEXT_PORT}"
+        f"/fulltext/{paper_uuid}",
+    ]
+    if not author_uuids:
+        urls[0] = None
+    results = list(upstream_executor.map(
+        lambda url: fetch_upstream(url) if url else (True, None), urls))
+    (ok_author, res_author), (ok_thumbnail, res_thumbnail), \
+        (ok_fulltext, res_fulltext) = results
+
+    authors_by_uuid = {
+        author["uuid"]: author
+        for author in (res_author or {}).get("authors", [])
+    }
+    authors = [
+        {"uuid": u,
+         "name": (authors_by_uuid[u].get("last_name_ja", "") + " "
+                  + authors_by_uuid[u].get("first_name_ja", ""))}
+        for u in author_uuids if u in authors_by_uuid
+    ]
+    fulltexts = (res_fulltext or {}).get("fulltexts", [])
+    first_pages = [page for page in fulltexts if page["page_number"] == 0]
+    abstract = extract_abstract(first_pages[0]["text"]) if first_pages else ""
+    pages = (paper.get("file") or {}).get("pages") or len(fulltexts) or None
+
+    thumbnails = (res_thumbnail or {}).get("images", [])
+    # 著者が見つからない場合や，PDF があるのに全文・画像がまだ無い場合
+    # (fulltext・thumbnail が処理中) も後から揃うため作り直す
+    has_file = bool(paper.get("file"))
+    complete = (ok_author and ok_thumbnail and ok_fulltext
+                and len(authors) == len(author_uuids)
+                and not (has_file and (not fulltexts or not thumbnails)))
+    built_at = datetime.now(timezone.utc)
+    detail = {
+        "uuid": paper_uuid,
+        "title": paper.get("title"),
+        "label": paper.get("label"),
+        "is_public": paper.get("is_public"),
+        "created_at": paper.get("created_at"),
+        "updated_at": paper.get("updated_at") or paper.get("created_at"),
+        "keywords": paper.get("keywords", []),
+        "authors": authors,
+        "abstract": abstract,
+        "thumbnails": thumbnails,
+        "pages": pages,
+        "built_at": built_at,
+        "complete": complete,
+    }
+    if not complete:
+        delay = min(PAPER_DETAIL_RETRY_SEC * 2 ** retries,
+                    PAPER_DETAIL_RETRY_MAX_SEC)
+        detail["retries"] = retries + 1
+        detail["retry_at"] = built_at + timedelta(seconds=delay)
+    return detail
+
+
+def refresh_paper_detail(paper_uuid: UUID) -> Optional[dict]:
+    """論文ページ用の詳細を作り直して保存する (論文が無ければ削除する)"""
+    paper = db["paper"].find_one(
+        {"uuid": paper_uuid}, {"_id": 0, "pending_events": 0})
+    if paper is None:
+        db["paper_details"].delete_one({"uuid": paper_uuid})
+        return None
+    previous = db["paper_details"].find_one(
+        {"uuid": paper_uuid}, {"retries": 1})
+    detail = build_paper_detail(paper, (previous or {}).get("retries", 0))
+    db["paper_details"].replace_one(
+        {"uuid": paper_uuid}, detail, upsert=True)
+    return detail
+
+
+PAPER_DETAIL_GROUP = "paper-detail"
+
+
+def sync_paper_details() -> int:
+    """変更イベントのあった論文と，不完全な詳細を作り直す
+
+    変更フィードを group "paper-detail" として読むため，貸し出しを得た
+    1つのレプリカだけが作り直す．作り直した詳細の数を返す．
+    """
+    if not acquire_lease(f"events:{PAPER_DETAIL_GROUP}", INSTANCE_ID,
+                         EVENT_GROUP_LEASE_SEC):
+        return 0
+    after = group_cursor(PAPER_DETAIL_GROUP)
+    events = read_events(after, PAPER_DETAIL_BATCH, [])
+    # 同じ論文のイベントが続いても1回だけ作り直す
+    paper_uuids = list(dict.fromkeys(event["paper_uuid"] for event in events))
+    retry = db["paper_details"].find(
+        {"retry_at": {"$lt": datetime.now(timezone.utc)}}, {"uuid": 1}
+    ).limit(PAPER_DETAIL_BATCH)
+    paper_uuids.extend(
+        entry["uuid"] for entry in retry if entry["uuid"] not in paper_uuids)
+
+    for paper_uuid in paper_uuids:
+        try:
+            refresh_paper_detail(paper_uuid)
+        except Exception as e:
+            logger.error("Fail to build paper detail %s: %s", paper_uuid, e)
+    if events:
+        db["event_groups"].update_one(
+            {"_id": PAPER_DETAIL_GROUP},
+            {"$max": {"cursor": events[-1]["seq"]},
+             "$set": {"consumer": INSTANCE_ID,
+                      "updated_at": datetime.now(timezone.utc)}},
+            upsert=True)
+    return len(paper_uuids)
+
+
+async def run_detail_builder():
+    while True:
+        try:
+            built = await run_in_threadpool(sync_paper_details)
+        except Exception as e:
+            logger.error("Fail to sync paper details: %s", e)
+            built = 0
+        if built < PAPER_DETAIL_BATCH:
+            await asyncio.sleep(PAPER_DETAIL_INTERVAL_SEC)
+
+
+@app.get("/paper/{paper_uuid}/detail", response_model=PaperDetail)
+def read_paper_detail_handler(paper_uuid: UUID):
+    """論文ページの表示に必要な情報を1回で返す"""
+    detail = db["paper_details"].find_one(
+        {"uuid": paper_uuid, "is_public": True}, {"_id": 0})
+    if detail is None:
+        # まだ作っていなければその場で作る
+        if db["paper"].count_documents(
+                {"uuid": paper_uuid, "is_public": True}, limit=1) == 0:
+            raise HTTPException(status_code=404, detail="Not Found")
+        detail = refresh_paper_detail(paper_uuid)
+        if detail is None or not detail["is_public"]:
+            raise HTTPException(status_code=404, detail="Not Found")
+    return detail
+
+
+@app.post("/paper/{paper_uuid}/detail", response_model=StatusResponse)
+def refresh_paper_detail_handler(paper_uuid: UUID):
+    """論文ページ用の詳細を作り直す (全文や画像を作り終えたサービスが呼ぶ)"""
+    if refresh_paper_detail(paper_uuid) is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return StatusResponse(status="ok", message="Refreshed paper detail")
 
 
 @app.get("/paper/{paper_uuid}", response_model=PaperRead)
@@ -209,31 +1482,275 @@ def read_paper_handler(paper_uuid: UUID):
         raise HTTPException(status_code=404, detail="Not Found")
 
 
+# ページオブジェクトの宣言 (/Type /Pages は含めない)
+PDF_PAGE_PATTERN = re.compile(rb"/Type\s*/Page[^A-Za-z]")
+
+
+class PdfDigest:
+    """PDF を読みながら SHA-256，サイズ，ページ数を求める
+
+    ページ数は圧縮されていないページオブジェクトの数のため，
+    オブジェクトストリームを使う PDF では求まらず None となる．
+    """
+
+    TAIL_BYTES = 64
+
+    def __init__(self):
+        self._sha256 = hashlib.sha256()
+        self._tail = b""
+        self._pages = 0
+        self.size = 0
+
+    def update(self, chunk: bytes):
+        self._sha256.update(chunk)
+        self.size += len(chunk)
+        # チャンクの境界をまたぐ宣言も数えるため，直前の末尾とつなげて探す
+        data = self._tail + chunk
+        self._pages += sum(
+            1 for m in PDF_PAGE_PATTERN.finditer(data)
+            if m.end() > len(self._tail))
+        self._tail = data[-self.TAIL_BYTES:]
+
+    @property
+    def sha256(self) -> str:
+        return self._sha256.hexdigest()
+
+    @property
+    def pages(self) -> Optional[int]:
+        return self._pages or None
+
+
+def digest_pdf(fileobj) -> PdfDigest:
+    digest = PdfDigest()
+    fileobj.seek(0)
+    while chunk := fileobj.read(DOWNLOAD_CHUNK_BYTES):
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest
+
+
+def paper_object_name(sha256: str) -> str:
+    return f"{OBJECT_PREFIX}{sha256}.pdf"
+
+
+bucket_ready = False
+
+
+async def ensure_bucket():
+    global bucket_ready
+    if bucket_ready:
+        return
+    exist = await run_minio(minio_client.bucket_exists, MINIO_BUCKET_NAME)
+    if not exist:
+        await run_minio(minio_client.make_bucket, MINIO_BUCKET_NAME)
+    bucket_ready = True
+
+
+async def object_exists(object_name: str) -> bool:
+    try:
+        await run_minio(
+            minio_client.stat_object, MINIO_BUCKET_NAME, object_name)
+        return True
+    except S3Error as e:
+        if s3_error_status(e) == 404:
+            return False
+        raise
+
+
 @app.post("/paper/{paper_uuid}/upload", response_model=StatusResponse)
 async def upload_paper_file_handler(
         paper_uuid: UUID,
         file: UploadFile = File(...)):
+    if file.content_type != "application/pdf":
+        raise HTTPException(status_code=400, detail="Invalid Content-Type")
+    # 存在しない論文の PDF を保存しないよう先に確かめる
+    if await run_in_threadpool(
+            db["paper"].count_documents, {"uuid": paper_uuid}, limit=1) == 0:
+        raise HTTPException(status_code=404, detail="Not Found")
+    created = False
     try:
-        if file.content_type != "application/pdf":
-            raise HTTPException(status_code=400, detail="Invalid Content-Type")
         # print("file number:", file.file.fileno())
-        exist = minio_client.bucket_exists(MINIO_BUCKET_NAME)
-        if not exist:
-            minio_client.make_bucket(MINIO_BUCKET_NAME)
-        response = minio_client.put_object(
-            MINIO_BUCKET_NAME,
-            f"{paper_uuid}.pdf",
-            file.file,
-            length=-1,
-            part_size=10 * 1024 * 1024,
-            content_type="application/pdf",
-        )
-        return StatusResponse(**{"status": "ok"})
-        response.close()
-        response.release_conn()
+        digest = await run_in_threadpool(digest_pdf, file.file)
+        object_name = paper_object_name(digest.sha256)
+        await ensure_bucket()
+        # 同じ内容が保存済みなら送らない
+        if not await object_exists(object_name):
+            created = True
+            await run_minio(
+                minio_client.put_object,
+                MINIO_BUCKET_NAME,
+                object_name,
+                file.file,
+                length=digest.size,
+                part_size=10 * 1024 * 1024,
+                content_type="application/pdf",
+            )
+        else:
+            logger.info("Deduplicated upload: %s", object_name)
     except S3Error as e:
         logger.error("Upload exception: %s", e)
         raise HTTPException(status_code=503, detail=str(e.message))
+    except urllib3.exceptions.HTTPError as e:
+        logger.error("Upload exception: %s", e)
+        raise HTTPException(status_code=503, detail="Storage Unavailable")
+
+    paper_file = PaperFile(
+        sha256=digest.sha256, size=digest.size, pages=digest.pages)
+    # 差し替え前の PDF を後で片付けるため更新前の文書を受け取る
+    previous = await run_in_threadpool(
+        db["paper"].find_one_and_update,
+        {"uuid": paper_uuid},
+        {"$set": {"file": paper_file.model_dump()},
+         "$push": {"pending_events": paper_event(
+             "paper.uploaded", paper_uuid, **paper_file.model_dump())}},
+        projection={"_id": 0, "uuid": 1, "file": 1},
+        return_document=ReturnDocument.BEFORE,
+    )
+    if previous is None:
+        # 確かめた後に論文が消えた場合は，保存した PDF を他で使っていなければ消す
+        if created:
+            await remove_unreferenced_object(digest.sha256)
+        raise HTTPException(status_code=404, detail="Not Found")
+    await run_in_threadpool(bump_version, VERSIONED_COLLECTION)
+    previous_sha256 = (previous.get("file") or {}).get("sha256")
+    if previous_sha256 and previous_sha256 != digest.sha256:
+        await remove_unreferenced_object(previous_sha256)
+    return StatusResponse(status="ok", message=digest.sha256)
+
+
+async def remove_unreferenced_object(sha256: str):
+    """どの論文からも参照されていない PDF を削除する"""
+    if await run_in_threadpool(
+            db["paper"].count_documents,
+            {"file.sha256": sha256}, limit=1) > 0:
+        return
+    try:
+        await run_minio(minio_client.remove_object,
+                        MINIO_BUCKET_NAME, paper_object_name(sha256))
+    except (S3Error, urllib3.exceptions.HTTPError) as e:
+        # 残っても参照されないだけのため，アップロード自体は失敗にしない
+        logger.warning("Fail to remove unreferenced object %s: %s", sha256, e)
+
+
+def s3_error_status(e: S3Error) -> int:
+    if e.code in ("NoSuchKey", "NoSuchBucket", "ResourceNotFound"):
+        return 404
+    return 503
+
+
+class PaperObject(BaseModel):
+    name: str
+    size: int
+    etag: str
+    last_modified: Optional[datetime] = None
+
+
+async def find_paper_object(paper_uuid: UUID) -> PaperObject:
+    """論文の PDF の保存先とサイズ・ETag を求める"""
+    entry = await run_in_threadpool(
+        db["paper"].find_one, {"uuid": paper_uuid}, {"file": 1})
+    if entry and entry.get("file"):
+        # 内容のハッシュをそのまま強い ETag として使う
+        paper_file = PaperFile(**entry["file"])
+        return PaperObject(
+            name=paper_object_name(paper_file.sha256),
+            size=paper_file.size,
+            etag=f'"{paper_file.sha256}"',
+        )
+
+    # ハッシュで保存する前にアップロードされた PDF
+    object_name = f"{paper_uuid}.pdf"
+    try:
+        stat = await run_minio(
+            minio_client.stat_object, MINIO_BUCKET_NAME, object_name)
+    except S3Error as e:
+        logger.error("Download exception: %s", e)
+        raise HTTPException(status_code=s3_error_status(e),
+                            detail=str(e.message))
+    except urllib3.exceptions.HTTPError as e:
+        # MinIO に接続できない (MaxRetryError など)
+        logger.error("Download exception: %s", e)
+        raise HTTPException(status_code=503, detail="Storage Unavailable")
+    return PaperObject(
+        name=object_name,
+        size=stat.size,
+        etag=f'"{stat.etag}"',
+        last_modified=stat.last_modified,
+    )
+
+
+def object_headers(paper_object: PaperObject) -> dict:
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": paper_object.etag,
+    }
+    if paper_object.last_modified is not None:
+        headers["Last-Modified"] = formatdate(
+            paper_object.last_modified.timestamp(), usegmt=True)
+    return headers
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return etag in tags
+
+
+def if_range_matches(if_range: str, paper_object: PaperObject) -> bool:
+    """If-Range (ETag または HTTP-date) が現在の PDF と一致するか
+
+    日付は Last-Modified と秒まで一致する場合だけ一致とみなす．ハッシュで
+    保存した PDF は Last-Modified を返さないため日付では一致しない．
+    """
+    if if_range.startswith(('"', "W/")):
+        # 弱い ETag とは一致させない
+        return if_range == paper_object.etag
+    if paper_object.last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_range)
+    except (TypeError, ValueError):
+        return False
+    return int(since.timestamp()) == int(paper_object.last_modified.timestamp())
+
+
+def parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Range ヘッダを (先頭, 末尾) のバイト位置に変換する
+
+    単一の範囲指定のみに対応し，解釈できない指定は None (全体を返す) とする．
+    """
+    match = re.fullmatch(r"\s*bytes=(\d*)-(\d*)\s*", range_header)
+    if match is None or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+    else:
+        # 末尾から指定バイト数
+        start = max(0, size - int(last))
+        end = size - 1
+    if start >= size or end < start:
+        raise HTTPException(
+            status_code=416, headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+
+async def iter_object(response):
+    try:
+        while True:
+            chunk = await run_minio(response.read, DOWNLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        response.close()
+        response.release_conn()
 
 
 @app.get(
@@ -242,36 +1759,143 @@ async def upload_paper_file_handler(
         200: {
             "content": {"application/pdf": {}},
             "description": "Return the PDF file",
-        }
+        },
+        206: {
+            "content": {"application/pdf": {}},
+            "description": "Return the requested range of the PDF file",
+        },
     },
 )
-async def download_paper_handler(paper_uuid: UUID):
+async def download_paper_handler(
+    paper_uuid: UUID,
+    range_header: Optional[str] = Header(default=None, alias="range"),
+    if_range: Optional[str] = Header(default=None),
+    if_none_match: Optional[str] = Header(default=None),
+):
+    paper_object = await find_paper_object(paper_uuid)
+    headers = object_headers(paper_object)
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    # If-Range が現在の PDF と異なれば範囲指定を無視して全体を返す
+    byte_range = None
+    if range_header and (
+            if_range is None or if_range_matches(if_range, paper_object)):
+        byte_range = parse_range(range_header, paper_object.size)
+
+    status_code = 200
+    offset, length = 0, paper_object.size
+    if byte_range is not None:
+        status_code = 206
+        offset, length = byte_range[0], byte_range[1] - byte_range[0] + 1
+        headers["Content-Range"] = \
+            f"bytes {byte_range[0]}-{byte_range[1]}/{paper_object.size}"
+    headers["Content-Length"] = str(length)
+
     try:
-        response = minio_client.get_object(
-            MINIO_BUCKET_NAME, f"{paper_uuid}.pdf")
-        return Response(content=response.read(), media_type="application/pdf")
-        response.close()
-        response.release_conn()
+        # length=0 は末尾までの意味になるため空のファイルでも問題ない
+        response = await run_minio(
+            minio_client.get_object,
+            MINIO_BUCKET_NAME,
+            paper_object.name,
+            offset=offset,
+            length=length,
+        )
     except S3Error as e:
         logger.error("Download exception: %s", e)
-        _status_code = (
-            404 if e.code in (
-                "NoSuchKey",
-                "NoSuchBucket",
-                "ResourceNotFound") else 503)
-        raise HTTPException(status_code=_status_code, detail=str(e.message))
+        raise HTTPException(status_code=s3_error_status(e),
+                            detail=str(e.message))
+    except urllib3.exceptions.HTTPError as e:
+        # MinIO に接続できない (MaxRetryError など)
+        logger.error("Download exception: %s", e)
+        raise HTTPException(status_code=503, detail="Storage Unavailable")
+    return StreamingResponse(
+        iter_object(response),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/pdf",
+    )
+
+
+@app.get("/paper/{paper_uuid}/download/url", response_model=PresignedUrl)
+async def presign_paper_handler(
+        paper_uuid: UUID, response: Response, public: bool = False):
+    """論文の PDF を MinIO から直接取得する期限付きの URL を返す
+
+    public=true ならクライアントを転送するための MINIO_PUBLIC_HOST の URL を返す．
+    """
+    paper_object = await find_paper_object(paper_uuid)
+    headers = object_headers(paper_object)
+    url = await run_minio(
+        presign_clients[public].presigned_get_object,
+        MINIO_BUCKET_NAME,
+        paper_object.name,
+        expires=timedelta(seconds=PRESIGNED_URL_TTL_SEC),
+        response_headers={"response-content-type": "application/pdf"},
+    )
+    response.headers["Cache-Control"] = "no-store"
+    return PresignedUrl(
+        url=url,
+        expires_in=PRESIGNED_URL_TTL_SEC,
+        etag=headers["ETag"],
+        last_modified=headers.get("Last-Modified"),
+    )
+
+
+@app.head("/paper/{paper_uuid}/download")
+async def head_paper_handler(paper_uuid: UUID):
+    # 本文は読まずにオブジェクトの情報だけを返す
+    paper_object = await find_paper_object(paper_uuid)
+    headers = object_headers(paper_object)
+    headers["Content-Length"] = str(paper_object.size)
+    return Response(headers=headers, media_type="application/pdf")
+
+
+@app.patch("/paper/keywords/bulk", response_model=BulkResults)
+def update_papers_keywords_bulk_handler(body: PaperKeywordsUpdateSeveral):
+    check_bulk_size(body.updates)
+    uuids = [update.uuid for update in body.updates]
+    if not uuids:
+        return bulk_results([], {})
+
+    # 存在しない論文は更新できないため先に調べて結果に含める
+    found = {
+        entry["uuid"]
+        for entry in db["paper"].find({"uuid": {"$in": uuids}}, {"uuid": 1})
+    }
+    errors = {i: "Not Found"
+              for i, uuid in enumerate(uuids) if uuid not in found}
+    requests = [
+        UpdateOne({"uuid": update.uuid},
+                  {"$set": {"keywords": update.keywords},
+                   "$push": {"pending_events": paper_event(
+                       "paper.updated", update.uuid, fields=["keywords"])}})
+        for update in body.updates
+    ]
+    try:
+        db["paper"].bulk_write(requests, ordered=False)
+    except BulkWriteError as e:
+        for err in e.details.get("writeErrors", []):
+            errors[err["index"]] = err["errmsg"]
+    finally:
+        # 一部だけ更新できた場合も版を進める
+        bump_version(VERSIONED_COLLECTION)
+    return bulk_results(uuids, errors)
 
 
 @app.patch("/paper/{paper_uuid}/keywords", response_model=PaperRead)
 def update_paper_keywords_handler(paper_uuid: UUID, body: PaperKeywordsUpdate):
     result = db["paper"].find_one_and_update(
         {"uuid": paper_uuid},
-        {"$set": {"keywords": body.keywords}},
-        projection={"_id": 0},
+        {"$set": {"keywords": body.keywords},
+         "$push": {"pending_events": paper_event(
+             "paper.updated", paper_uuid, fields=["keywords"])}},
+        projection={"_id": 0, "pending_events": 0},
         return_document=ReturnDocument.AFTER,
     )
     if result is None:
         raise HTTPException(status_code=404, detail="Not Found")
+    bump_version(VERSIONED_COLLECTION)
     return PaperRead(**result)
 
 
@@ -294,6 +1918,11 @@ def update_paper_keywords_handler(paper_uuid: UUID, body: PaperKeywordsUpdate):
 def delete_paper_handler():
     res = db["paper"].delete_many({})
     logger.info("%d documents deleted.", res.deleted_count)
+    # 変更フィードと版も初期化する (版はエポックが変わり古い ETag は一致しない)
+    for name in ("paper_details", "outbox", "counters", "leases",
+                 "event_groups", "versions"):
+        db[name].delete_many({})
+    bump_version(VERSIONED_COLLECTION)
     delete_object_list = map(
         lambda x: DeleteObject(x.object_name),
         minio_client.list_objects(MINIO_BUCKET_NAME, recursive=True),
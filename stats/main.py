@@ -1,14 +1,16 @@
+import hashlib
 import logging
 import os
 import sys
+from contextlib import asynccontextmanager
 from datetime import datetime
-from http.client import HTTPException
 from ipaddress import IPv4Address
 from typing import List, Literal, Optional
-from uuid import UUID
+from uuid import UUID, uuid4
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
 from opentelemetry import trace
 from opentelemetry._logs import set_logger_provider
 from opentelemetry.exporter.otlp.proto.grpc._log_exporter import \
@@ -23,8 +25,9 @@ from opentelemetry.sdk.resources import Resource
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor
 from pydantic import BaseModel
-from pymongo import MongoClient
+from pymongo import ASCENDING, MongoClient
 from pymongo.errors import ConnectionFailure, OperationFailure
+from starlette.concurrency import run_in_threadpool
 
 # ログ設定
 logging.basicConfig(level=logging.INFO)
@@ -76,7 +79,27 @@ PymongoInstrumentor().instrument()
 client = MongoClient(MONGO_CONNECTION_STRING)
 db = client[MONGO_DBNAME]
 
-app = FastAPI()
+def ensure_indexes():
+    # 論文ごとのダウンロード数の集計と期間での絞り込みに使う
+    db["stats"].create_index(
+        [("paper_uuid", ASCENDING), ("timestamp", ASCENDING)],
+        name="paper_uuid_timestamp")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        ensure_indexes()
+    except Exception as e:
+        logger.error("Fail to provision indexes: %s", e)
+    try:
+        bump_version()
+    except Exception as e:
+        logger.error("Fail to initialize collection version: %s", e)
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 # FastAPI アプリケーションの計装
 FastAPIInstrumentor.instrument_app(app)
@@ -101,6 +124,10 @@ class StatsCreateUpdate(BaseModel):
     timestamp: datetime
 
 
+class StatsCreateSeveral(BaseModel):
+    events: List[StatsCreateUpdate]
+
+
 class StatsCount(BaseModel):
     paper_uuid: UUID
     total_downloads: int
@@ -110,6 +137,35 @@ class StatsCountSeveral(BaseModel):
     stats: List[StatsCount]
 
 
+def stats_version() -> str:
+    entry = db["versions"].find_one({"_id": "stats"})
+    return f"{entry['epoch']}.{entry['version']}" if entry else "0"
+
+
+def bump_version():
+    db["versions"].update_one(
+        {"_id": "stats"},
+        {"$inc": {"version": 1}, "$setOnInsert": {"epoch": uuid4().hex}},
+        upsert=True)
+
+
+@app.middleware("http")
+async def etag_middleware(request: Request, call_next):
+    """ダウンロード数の読み出しに版から求めた ETag を付け，一致すれば 304 を返す"""
+    if request.method not in ("GET", "HEAD") or \
+            not request.url.path.startswith("/stats"):
+        return await call_next(request)
+    version = await run_in_threadpool(stats_version)
+    key = f"{version} {request.url.path}?{request.url.query}"
+    etag = '"' + hashlib.sha1(key.encode()).hexdigest() + '"'
+    if etag in request.headers.get("if-none-match", "").split(", "):
+        return Response(status_code=304, headers={"ETag": etag})
+    response = await call_next(request)
+    if response.status_code == 200:
+        response.headers["ETag"] = etag
+    return response
+
+
 @app.get("/", response_model=ServiceHello)
 def root_handler():
     return ServiceHello(name="stats")
@@ -157,6 +213,7 @@ def create_stats_handler(stats: StatsCreateUpdate):
     }
     try:
         insert_id = db["stats"].insert_one(my_stats).inserted_id
+        bump_version()
         logger.info("insert_id: %s", insert_id)
         return StatusResponse(status="ok",
                               message=f"Success insert = {insert_id}")
@@ -164,6 +221,31 @@ def create_stats_handler(stats: StatsCreateUpdate):
         raise HTTPException(status_code=500, detail="Fail to insert")
 
 
+@app.post("/stats/bulk", response_model=StatusResponse)
+def create_stats_bulk_handler(stats: StatsCreateSeveral):
+    # front でまとめて送られてくるため，記録時刻はイベントの発生時刻を使う
+    my_stats = [
+        {
+            "paper_uuid": str(event.paper_uuid),
+            "ip_v4_addr": str(event.ip_v4_addr),
+            "timestamp": event.timestamp,
+        }
+        for event in stats.events
+    ]
+    if not my_stats:
+        return StatusResponse(status="ok", message="Success insert = 0")
+    try:
+        res = db["stats"].insert_many(my_stats, ordered=False)
+        logger.info("insert count: %d", len(res.inserted_ids))
+        return StatusResponse(
+            status="ok", message=f"Success insert = {len(res.inserted_ids)}")
+    except Exception:
+        raise HTTPException(status_code=500, detail="Fail to insert")
+    finally:
+        # 失敗しても一部は記録されているかもしれない
+        bump_version()
+
+
 @app.get("/stats/{paper_id}", response_model=StatsCount)
 def read_stat_handler(paper_id: UUID):
     query = {"paper_uuid": str(paper_id)}
@@ -3,8 +3,10 @@ import logging
 import os
 import socket
 import sys
+import threading
 import time
 from contextlib import asynccontextmanager
+from datetime import timedelta
 from typing import Literal, Optional
 from uuid import UUID
 
@@ -38,6 +40,22 @@ MINIO_ACCESS_KEY = os.getenv("MINIO_ACCESS_KEY", "minio")
 MINIO_SECRET_KEY = os.getenv("MINIO_SECRET_KEY", "minio123")
 MINIO_HOST = os.getenv("MINIO_HOST", "thumbnail-minio:9000")
 MINIO_BUCKET_NAME = os.getenv("MINIO_BUCKET_NAME", "thumbnail")
+# 署名付き URL に使う MinIO のホスト．署名にホストが含まれるため URL を使う側から
+# 届くものを指定する (空なら MINIO_HOST)
+#   MINIO_INTERNAL_HOST: front が MinIO から直接中継するときに使う
+#   MINIO_PUBLIC_HOST: クライアントを MinIO へ転送するときに使う
+MINIO_INTERNAL_HOST = os.getenv("MINIO_INTERNAL_HOST", "")
+MINIO_PUBLIC_HOST = os.getenv("MINIO_PUBLIC_HOST", "")
+MINIO_PUBLIC_SECURE = os.getenv("MINIO_PUBLIC_SECURE", "false") == "true"
+MINIO_REGION = os.getenv("MINIO_REGION", "us-east-1")
+PRESIGNED_URL_TTL_SEC = int(os.getenv("PRESIGNED_URL_TTL_SEC", 300))
+# paper の変更フィードを読むグループ (既定では読まない．指定する場合は
+# front-admin の PAPER_EVENTS_CONSUMERS も true にする)
+EVENTS_GROUP = os.getenv("EVENTS_GROUP", "")
+EVENTS_CONSUMER = os.getenv(
+    "EVENTS_CONSUMER", f"{socket.gethostname()}-{os.getpid()}")
+EVENTS_WAIT_SEC = float(os.getenv("EVENTS_WAIT_SEC", 20))
+EVENTS_RETRY_SEC = float(os.getenv("EVENTS_RETRY_SEC", 5))
 
 # =============================================================================
 # OpenTelemetry setup
@@ -85,11 +103,69 @@ try:
         secret_key=MINIO_SECRET_KEY,
         secure=False,
     )
+    # 署名は手元で計算するため，リージョンを指定して問い合わせを省く．
+    # 公開用 (public=True) と内部用で別のホストに署名する
+    presign_clients = {
+        False: Minio(
+            MINIO_INTERNAL_HOST or MINIO_HOST,
+            access_key=MINIO_ACCESS_KEY,
+            secret_key=MINIO_SECRET_KEY,
+            secure=False,
+            region=MINIO_REGION,
+        ),
+        True: Minio(
+            MINIO_PUBLIC_HOST or MINIO_HOST,
+            access_key=MINIO_ACCESS_KEY,
+            secret_key=MINIO_SECRET_KEY,
+            secure=MINIO_PUBLIC_SECURE,
+            region=MINIO_REGION,
+        ),
+    }
 except (S3Error, urllib3.exceptions.MaxRetryError) as e:
     logger.error(e)
     sys.exit(-1)
 
 
+def refresh_paper_detail(paper_uuid: UUID):
+    # 論文ページ用の詳細に反映する (失敗しても paper が後で作り直す)
+    try:
+        requests.post(
+            f"http://{PAPER_SVC_HOST}/paper/{paper_uuid}/detail", timeout=10
+        ).raise_for_status()
+    except Exception as e:
+        logger.warning("Fail to refresh paper detail %s: %s", paper_uuid, e)
+
+
+def consume_paper_events(handle):
+    """paper の変更フィードで論文ファイルの登録を受け取り handle を呼ぶ
+
+    イベントごとに読んだ位置を記録する．失敗したイベントはログに残して
+    次へ進む．
+    """
+    events_url = f"http://{PAPER_SVC_HOST}/paper/events"
+    params = {"types": "paper.uploaded", "group": EVENTS_GROUP,
+              "consumer": EVENTS_CONSUMER, "wait": EVENTS_WAIT_SEC}
+    while True:
+        try:
+            res = requests.get(
+                events_url, params=params, timeout=EVENTS_WAIT_SEC + 10)
+            res.raise_for_status()
+            for event in res.json()["events"]:
+                try:
+                    handle(UUID(event["paper_uuid"]))
+                except Exception as e:
+                    logger.error("Fail to handle event %s: %s", event["id"], e)
+                requests.put(
+                    f"{events_url}/groups/{EVENTS_GROUP}",
+                    json={"consumer": EVENTS_CONSUMER, "cursor": event["seq"]},
+                    timeout=10,
+                ).raise_for_status()
+        except Exception as e:
+            # 貸し出しを失った場合も含め，記録した位置から読み直す
+            logger.warning("Fail to consume paper events: %s", e)
+            time.sleep(EVENTS_RETRY_SEC)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """アプリケーション起動時にMinIOバケットを確認・作成"""
@@ -106,6 +182,12 @@ async def lifespan(app: FastAPI):
         minio_client.make_bucket(MINIO_BUCKET_NAME)
     else:
         logger.info("Bucket '%s' already exists", MINIO_BUCKET_NAME)
+    if EVENTS_GROUP:
+        threading.Thread(
+            target=consume_paper_events,
+            args=(create_thumbnail,),
+            daemon=True,
+        ).start()
     yield
 
 
@@ -210,6 +292,7 @@ def create_thumbnail(paper_uuid: UUID):
         file_url = f"http://{PAPER_SVC_HOST}/paper/{paper_uuid}/download"
         logger.info("Fetch url: %s", file_url)
         pdf_data = requests.get(file_url)
+        pdf_data.raise_for_status()
     except Exception:
         raise HTTPException(status_code=400,
                             detail="Cloud not downloads the file.")
@@ -237,6 +320,7 @@ def create_thumbnail(paper_uuid: UUID):
             content_type="image/png",
         )
 
+    refresh_paper_detail(paper_uuid)
     return {"status": "ok"}
 
 
@@ -263,6 +347,36 @@ def read_thumbnail(paper_uuid: UUID, image_id: str):
         raise HTTPException(status_code=res_status, detail=res_message)
 
 
+@app.get("/thumbnail/{paper_uuid}/{image_id}/url")
+def presign_thumbnail(
+        paper_uuid: UUID, image_id: str, response: Response,
+        public: bool = False):
+    """画像を MinIO から直接取得する期限付きの URL を返す
+
+    public=true ならクライアントを転送するための MINIO_PUBLIC_HOST の URL を返す．
+    """
+    obj_path = f"{paper_uuid}/{image_id}.png"
+    try:
+        # 署名付き URL は存在を確かめずに作れるため先に確かめる
+        minio_client.stat_object(MINIO_BUCKET_NAME, obj_path)
+    except S3Error as e:
+        logger.error("Presign exception: %s", e)
+        _status_code = (
+            404 if e.code in (
+                "NoSuchKey",
+                "NoSuchBucket",
+                "ResourceNotFound") else 503)
+        raise HTTPException(status_code=_status_code, detail=str(e.message))
+    url = presign_clients[public].presigned_get_object(
+        MINIO_BUCKET_NAME,
+        obj_path,
+        expires=timedelta(seconds=PRESIGNED_URL_TTL_SEC),
+        response_headers={"response-content-type": "image/png"},
+    )
+    response.headers["Cache-Control"] = "no-store"
+    return {"url": url, "expires_in": PRESIGNED_URL_TTL_SEC}
+
+
 @app.delete("/reset", response_model=StatusResponse)
 def delete_thumbnail_handler():
     delete_object_list = map(